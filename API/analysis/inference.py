@@ -0,0 +1,68 @@
+import os
+from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+from .. import configWatcher
+
+BACKENDS = ('torch', 'torch-int8', 'onnx', 'onnx-int8')
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+
+def getBackend():
+    # The environment variable wins so benchmarks can switch backends per process
+    backend = os.environ.get("CRYPTOLOGGER_INFERENCE_BACKEND") or configWatcher.getConfig()["inference-backend"]
+    if backend not in BACKENDS:
+        print(f"[Inference] Unknown backend '{backend}', using torch")
+        return 'torch'
+    return backend
+
+def exportOnnx(model_name, quantize):
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+
+    # Exported (and quantized) models are cached so only the first start pays for the export
+    export_dir = os.path.join(MODELS_DIR, model_name.replace('/', '--'), 'onnx')
+    if not os.path.exists(os.path.join(export_dir, 'model.onnx')):
+        print(f"[Inference] Exporting {model_name} to ONNX")
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        model.save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+
+    if not quantize:
+        return ORTModelForSequenceClassification.from_pretrained(export_dir)
+
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    quantized_dir = os.path.join(MODELS_DIR, model_name.replace('/', '--'), 'onnx-int8')
+    if not os.path.exists(os.path.join(quantized_dir, 'model_quantized.onnx')):
+        print(f"[Inference] Quantizing {model_name} to int8")
+        quantizer = ORTQuantizer.from_pretrained(export_dir)
+        quantizer.quantize(save_dir=quantized_dir, quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False))
+
+    return ORTModelForSequenceClassification.from_pretrained(quantized_dir, file_name='model_quantized.onnx')
+
+def loadPipeline(task, model_name, backend=None, strict=False):
+    # strict raises instead of falling back to torch, for callers that must measure the backend they asked for
+    backend = backend or getBackend()
+
+    if backend == 'torch':
+        return pipeline(task, model=model_name)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    if backend == 'torch-int8':
+        import torch
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        print(f"[Inference] Loaded {model_name} with int8 dynamic quantization")
+        return pipeline(task, model=model, tokenizer=tokenizer)
+
+    try:
+        model = exportOnnx(model_name, quantize=backend == 'onnx-int8')
+    except ImportError:
+        if strict:
+            raise
+        print("[Inference] optimum[onnxruntime] is not installed, using torch")
+        return pipeline(task, model=model_name)
+
+    print(f"[Inference] Loaded {model_name} with ONNX Runtime ({backend})")
+    return pipeline(task, model=model, tokenizer=tokenizer)
@@ -0,0 +1,108 @@
+import os
+import re
+import zlib
+import threading
+import numpy as np
+from datetime import datetime, timezone, timedelta
+from .. import cluster
+from .. import storage
+
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always share a band
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 5  # Stubs with fewer shingles would "match" any other stub, so they bypass the index
+SIMILARITY_THRESHOLD = 0.8
+RETENTION_DAYS = 7
+MERSENNE_PRIME = (1 << 31) - 1
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+INDEX_DIR = os.path.join(BASE_DIR, "logs", "news_articles")
+
+def indexPath():
+    return os.path.join(INDEX_DIR, cluster.shardName("minhash_index.json"))
+
+_rng = np.random.default_rng(42)
+_perm_a = _rng.integers(1, MERSENNE_PRIME, NUM_PERM, dtype=np.uint64)
+_perm_b = _rng.integers(0, MERSENNE_PRIME, NUM_PERM, dtype=np.uint64)
+
+_lock = threading.Lock()
+_index = {'entries': None, 'bands': {}}
+
+def shingles(text):
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def signature(text):
+    text_shingles = shingles(text)
+    if len(text_shingles) < MIN_SHINGLES:
+        return None
+    hashes = np.array([zlib.crc32(s.encode('utf-8')) % MERSENNE_PRIME for s in text_shingles], dtype=np.uint64)
+    # All permutations at once: (a * x + b) mod p, minimum over shingles
+    return ((np.outer(_perm_a, hashes) + _perm_b[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+def bandKeys(sig):
+    return [f"{band}:{zlib.crc32(sig[band * ROWS:(band + 1) * ROWS].tobytes()):08x}" for band in range(BANDS)]
+
+def retentionCutoff():
+    return (datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS)).isoformat()
+
+def rebuildIndex(entries):
+    _index['entries'] = []
+    _index['bands'] = {}
+    for entry in entries:
+        addEntry(entry['signature'], entry['url'], entry['published_at'], entry['score'])
+
+def loadIndex():
+    if _index['entries'] is not None:
+        return
+
+    cutoff = retentionCutoff()
+    data = storage.readJson(indexPath(), {'entries': []})
+    rebuildIndex({**entry, 'signature': np.array(entry['signature'], dtype=np.uint64)}
+                 for entry in data['entries'] if entry['published_at'] >= cutoff)
+
+def addEntry(sig, url, published_at, score):
+    entry = {'signature': sig, 'url': url, 'published_at': published_at, 'score': score}
+    _index['entries'].append(entry)
+    for key in bandKeys(sig):
+        _index['bands'].setdefault(key, []).append(entry)
+
+def findDuplicate(text):
+    # Returns the new article's signature and the closest indexed near-duplicate, if any;
+    # (None, None) for texts too short to compare
+    sig = signature(text)
+    if sig is None:
+        return None, None
+    with _lock:
+        loadIndex()
+        best, best_similarity = None, SIMILARITY_THRESHOLD
+        for key in bandKeys(sig):
+            for entry in _index['bands'].get(key, []):
+                similarity = float(np.mean(entry['signature'] == sig))
+                if similarity >= best_similarity:
+                    best, best_similarity = entry, similarity
+    return sig, best
+
+def add(sig, url, published_at, score):
+    with _lock:
+        loadIndex()
+        if isinstance(published_at, datetime):
+            published_at = published_at.astimezone(timezone.utc).isoformat()
+        addEntry(sig, url, published_at, score)
+
+def save():
+    # Drops entries past the retention window and persists the rest; called once per news cycle
+    with _lock:
+        if _index['entries'] is None:
+            return
+        cutoff = retentionCutoff()
+        entries = [entry for entry in _index['entries'] if entry['published_at'] >= cutoff]
+        if len(entries) != len(_index['entries']):
+            rebuildIndex(entries)
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        storage.writeJson(indexPath(), {'entries': [
+            {**entry, 'signature': entry['signature'].tolist()} for entry in entries
+        ]})
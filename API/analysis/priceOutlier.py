@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 import os
 from scipy import stats
+from .. import mergedHistory
 from datetime import datetime, timedelta, timezone
 
 def detectOutliersIQR(series):
@@ -18,25 +19,38 @@ def detectOutlierZ(series, threshold=3):
     z_scores = np.abs(stats.zscore(series))
     return pd.Series(z_scores > threshold, index=series.index)
 
-def isPriceOutlier(symbol: str, live_price: float) -> bool:
-    symbol = symbol.upper()
+def loadHistoricalPrices(symbol):
+    # Prefer the reconciled dataset, fall back to the CoinGecko backup before the first merge
+    history = mergedHistory.getSymbolHistory(symbol)
+    if history is not None and not history.empty:
+        history = history[history['source'] != 'filled']
+        return pd.concat([history['open'], history['close']], ignore_index=True).astype(float)
+
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'logs', 'hist_data_backup'))
     file_path = os.path.join(base_dir, f"{symbol}.csv")
 
     if not os.path.exists(file_path):
-        print(f"[Outlier] Historical data file not found for {symbol}")
-        return False
+        return None
+
+    df = pd.read_csv(file_path)
+    return pd.concat([
+        df['open'].astype(float),
+        df['close'].astype(float)
+    ], ignore_index=True)
+
+def isPriceOutlier(symbol: str, live_price: float) -> bool:
+    symbol = symbol.upper()
 
     try:
-        df = pd.read_csv(file_path)
-        prices = pd.concat([
-            df['open'].astype(float),
-            df['close'].astype(float)
-        ], ignore_index=True)
+        prices = loadHistoricalPrices(symbol)
     except Exception as e:
         print(f"[Outlier] Failed to read or process data for {symbol}: {e}")
         return False
 
+    if prices is None:
+        print(f"[Outlier] Historical data file not found for {symbol}")
+        return False
+
     # Append the live price to evaluate as a potential outlier
     combined_prices = pd.concat([prices, pd.Series([live_price])], ignore_index=True)
 
@@ -0,0 +1,271 @@
+import os
+import re
+import csv
+import zlib
+import random
+import threading
+import numpy as np
+from scipy import sparse
+from scipy.optimize import minimize
+from .. import metrics
+
+N_FEATURES = 2 ** 16
+MIN_TRAIN = 200
+RETRAIN_EVERY = 200
+TARGET_PRECISION = 0.95
+SAMPLE_RATE = 0.05  # Share of all items sent to the large model regardless of confidence, for audits and calibration
+MIN_HOLDOUT = 40
+MAX_LABELS = 20000  # labels.csv is trimmed to the newest KEEP_LABELS rows once it grows past this
+KEEP_LABELS = 15000
+L2 = 1.0
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+CASCADE_DIR = os.path.join(BASE_DIR, "logs", "cascade")
+LABELS_PATH = os.path.join(CASCADE_DIR, "labels.csv")
+MODEL_PATH = os.path.join(CASCADE_DIR, "model.npz")
+
+LABEL_FIELDS = ['keywords_key', 'label', 'sampled', 'text']
+
+_lock = threading.Lock()
+_model = {'loaded': False, 'data': None, 'training': None}
+_stats = {'total': 0, 'escalated': 0, 'audited': 0, 'audit_agreed': 0}
+_labels = {'counts': None, 'rows': 0}
+
+def keywordsKey(keywords):
+    # Labels and models are only valid for the keyword set they were produced with
+    return format(zlib.crc32("|".join(sorted(keywords)).encode('utf-8')), '08x')
+
+def tokenize(text):
+    words = re.findall(r"[a-z0-9$']+", text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def vectorize(texts, idf=None):
+    # Hashed unigram+bigram counts, sublinear tf, optional idf, L2-normalized rows
+    rows, cols, values = [], [], []
+    for row, text in enumerate(texts):
+        counts = {}
+        for token in tokenize(text):
+            index = zlib.crc32(token.encode('utf-8')) % N_FEATURES
+            counts[index] = counts.get(index, 0) + 1
+        for index, count in counts.items():
+            rows.append(row)
+            cols.append(index)
+            values.append(1.0 + np.log(count))
+
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(texts), N_FEATURES))
+    if idf is not None:
+        matrix = matrix.multiply(idf).tocsr()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+def sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+def fitLogistic(matrix, labels):
+    def loss(params):
+        weights, bias = params[:-1], params[-1]
+        p = sigmoid(matrix @ weights + bias)
+        eps = 1e-12
+        value = -np.mean(labels * np.log(p + eps) + (1 - labels) * np.log(1 - p + eps)) + L2 * weights @ weights / (2 * len(labels))
+        error = (p - labels) / len(labels)
+        gradient = np.append(matrix.T @ error + L2 * weights / len(labels), error.sum())
+        return value, gradient
+
+    result = minimize(loss, np.zeros(N_FEATURES + 1), jac=True, method='L-BFGS-B', options={'maxiter': 200})
+    return result.x[:-1], result.x[-1]
+
+def calibrateBand(probabilities, labels):
+    # Widest band edges whose confident decisions still match the large model TARGET_PRECISION of the time
+    order = np.argsort(probabilities)
+    p, y = probabilities[order], labels[order]
+
+    high = 1.01
+    for i in range(len(p)):
+        if y[i:].mean() >= TARGET_PRECISION:
+            high = p[i]
+            break
+
+    low = -0.01
+    for i in range(len(p), 0, -1):
+        if (1 - y[:i]).mean() >= TARGET_PRECISION:
+            low = p[i - 1]
+            break
+
+    return min(low, high), high
+
+def readRows():
+    if not os.path.exists(LABELS_PATH):
+        return []
+    with open(LABELS_PATH, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def readLabels(key):
+    # Rows written before the sampled column existed count as not sampled
+    texts, labels, sampled = [], [], []
+    for row in readRows():
+        if row['keywords_key'] == key:
+            texts.append(row['text'])
+            labels.append(int(row['label']))
+            sampled.append(row.get('sampled') == '1')
+    return texts, labels, sampled
+
+def labelCount(key):
+    # One pass over labels.csv per process; afterwards recordLabel keeps the counts up to date
+    if _labels['counts'] is None:
+        rows = readRows()
+        _labels['rows'] = len(rows)
+        _labels['counts'] = {}
+        for row in rows:
+            _labels['counts'][row['keywords_key']] = _labels['counts'].get(row['keywords_key'], 0) + 1
+        if rows and 'sampled' not in rows[0]:
+            writeLabels(rows)  # Add the sampled column to a file from before it existed
+    return _labels['counts'].get(key, 0)
+
+def writeLabels(rows):
+    with open(LABELS_PATH + '.tmp', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=LABEL_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows([{'sampled': '0', **row} for row in rows])
+    os.replace(LABELS_PATH + '.tmp', LABELS_PATH)
+
+def trimLabels(key):
+    # Only labels of the current keyword set are useful; keep the newest of them
+    rows = [row for row in readRows() if row['keywords_key'] == key][-KEEP_LABELS:]
+    writeLabels(rows)
+    _labels['rows'] = len(rows)
+    _labels['counts'] = {key: len(rows)}
+    print(f"[Cascade] Trimmed labels.csv to the newest {len(rows)} labels")
+
+def recordLabel(text, label, key, sampled):
+    labelCount(key)
+    os.makedirs(CASCADE_DIR, exist_ok=True)
+    is_new = not os.path.exists(LABELS_PATH)
+    with open(LABELS_PATH, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=LABEL_FIELDS)
+        if is_new:
+            writer.writeheader()
+        writer.writerow({'keywords_key': key, 'label': int(label), 'sampled': int(sampled), 'text': text})
+
+    _labels['rows'] += 1
+    _labels['counts'][key] = _labels['counts'].get(key, 0) + 1
+    if _labels['rows'] > MAX_LABELS:
+        trimLabels(key)
+
+def splitHoldout(sampled):
+    # Escalated items are by construction the uncertain ones, so only uniformly sampled labels
+    # give an unbiased holdout; the previous random split is the fallback until there are enough of them
+    rng = np.random.default_rng(0)
+    sampled_idx = np.flatnonzero(sampled)
+    if len(sampled_idx) >= MIN_HOLDOUT:
+        holdout_idx = rng.permutation(sampled_idx)[:max(MIN_HOLDOUT, len(sampled_idx) // 5)]
+    else:
+        holdout_idx = rng.permutation(len(sampled))[:len(sampled) // 5]
+    train_mask = np.ones(len(sampled), dtype=bool)
+    train_mask[holdout_idx] = False
+    return np.flatnonzero(train_mask), holdout_idx
+
+def train(key, texts, labels, sampled):
+    labels = np.array(labels, dtype=float)
+    if len(texts) < MIN_TRAIN or labels.min() == labels.max():
+        return None
+
+    # Fit on the rest of the labels and calibrate the uncertain band on the held-out ones
+    train_idx, holdout_idx = splitHoldout(np.array(sampled, dtype=bool))
+
+    counts = vectorize(texts)
+    document_frequency = np.bincount(counts.indices, minlength=N_FEATURES)
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1.0
+
+    matrix = vectorize(texts, idf)
+    weights, bias = fitLogistic(matrix[train_idx], labels[train_idx])
+    low, high = calibrateBand(sigmoid(matrix[holdout_idx] @ weights + bias), labels[holdout_idx])
+
+    model = {'weights': weights, 'bias': bias, 'idf': idf, 'low': low, 'high': high,
+             'keywords_key': key, 'trained_on': len(texts)}
+    os.makedirs(CASCADE_DIR, exist_ok=True)
+    np.savez_compressed(MODEL_PATH, **model)
+    print(f"[Cascade] Trained on {len(texts)} labels, confident below {low:.2f} and above {high:.2f}")
+    return model
+
+def loadModel(key):
+    if not _model['loaded']:
+        _model['loaded'] = True
+        if os.path.exists(MODEL_PATH):
+            with np.load(MODEL_PATH) as data:
+                _model['data'] = {name: data[name].item() if data[name].ndim == 0 else data[name] for name in data.files}
+
+    model = _model['data']
+    if model is not None and model['keywords_key'] != key:
+        model = _model['data'] = None
+    return model
+
+def retrain(key, texts, labels, sampled):
+    try:
+        model = train(key, texts, labels, sampled)
+    except Exception as e:
+        print(f"[Cascade] Retraining failed: {e}")
+        model = None
+
+    with _lock:
+        _model['training'] = None
+        # Swap the new model in only if the keywords did not change while it was training
+        if model is not None and (_model['data'] is None or _model['data']['keywords_key'] == key):
+            _model['data'] = model
+
+def maybeRetrain(key):
+    # Called with _lock held; the fit runs in a background thread so the Reddit thread never waits on it
+    if _model['training'] is not None:
+        return
+
+    model = _model['data']
+    label_count = labelCount(key)
+    trained_on = model['trained_on'] if model is not None else 0
+    if label_count >= MIN_TRAIN and label_count - trained_on >= RETRAIN_EVERY:
+        texts, labels, sampled = readLabels(key)
+        _model['training'] = threading.Thread(target=retrain, args=(key, texts, labels, sampled), daemon=True)
+        _model['training'].start()
+
+def isRelevant(text, keywords, large_model):
+    # Cheap linear model decides clear cases, the large model handles the uncertain band
+    key = keywordsKey(keywords)
+
+    with _lock:
+        model = loadModel(key)
+        _stats['total'] += 1
+
+        probability = None
+        if model is not None:
+            probability = float(sigmoid(vectorize([text], model['idf']) @ model['weights'] + model['bias'])[0])
+
+    # The sample is drawn before looking at confidence, so it is uniform over all items
+    sampled = model is None or random.random() < SAMPLE_RATE
+    confident = probability is not None and (probability <= model['low'] or probability >= model['high'])
+    if confident and not sampled:
+        metrics.incCounter('cascade_decisions_total', path='fast')
+        return probability >= model['high']
+
+    label = large_model(text)
+
+    with _lock:
+        recordLabel(text, label, key, sampled)
+        if confident:
+            agreed = label == (probability >= model['high'])
+            _stats['audited'] += 1
+            _stats['audit_agreed'] += agreed
+            metrics.incCounter('cascade_audits_total', result='agree' if agreed else 'disagree')
+        else:
+            _stats['escalated'] += 1
+            metrics.incCounter('cascade_decisions_total', path='escalated')
+        maybeRetrain(key)
+
+    return label
+
+def logStats():
+    with _lock:
+        total, escalated = _stats['total'], _stats['escalated']
+        audited, agreed = _stats['audited'], _stats['audit_agreed']
+
+    if total:
+        agreement = f"{agreed / audited:.1%} of {audited} audited" if audited else "no audits yet"
+        print(f"[Cascade] Escalation rate {escalated / total:.1%} ({escalated}/{total}), agreement with large model {agreement}")
@@ -1,7 +1,9 @@
-from transformers import pipeline
+from . import inference
+from .. import metrics
 
-finbert = pipeline("sentiment-analysis", model="ProsusAI/finbert")
+finbert = inference.loadPipeline("sentiment-analysis", "ProsusAI/finbert")
 
+@metrics.timed('finbert.sentiment')
 def getSentimentScore(text):
     try:
         result = finbert(text[:512])[0]  # Limit to 512 tokens
@@ -0,0 +1,148 @@
+import os
+import csv
+import math
+import bisect
+from datetime import datetime, timezone
+from .. import configWatcher
+from .. import storage
+
+WINDOWS = {'1h': 3600, '6h': 6 * 3600, '24h': 24 * 3600, '7d': 7 * 86400}
+MAX_WINDOW = max(WINDOWS.values())
+SOURCES = {
+    'news': ('news_articles', 'published_at'),
+    'reddit': ('reddit_posts', 'created_utc'),
+}
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+STATE_DIR = os.path.join(BASE_DIR, "logs", "sentiment_state")
+
+def statePath(symbol):
+    return os.path.join(STATE_DIR, f"{symbol.upper()}.json")
+
+def decayRate():
+    return math.log(2) / (configWatcher.getConfig()["sentiment-half-life-hours"] * 3600)
+
+def emptySource():
+    return {
+        'times': [],
+        'scores': [],
+        'windows': {name: {'start': 0, 'sum': 0.0, 'count': 0} for name in WINDOWS},
+        'decay': {'sum': 0.0, 'weight': 0.0, 'at': None},
+    }
+
+def parseTime(value):
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+def advance(source, now):
+    # Slide every window forward, then drop items that have left even the widest one
+    for name, seconds in WINDOWS.items():
+        window = source['windows'][name]
+        while window['start'] < len(source['times']) and source['times'][window['start']] <= now - seconds:
+            window['sum'] -= source['scores'][window['start']]
+            window['count'] -= 1
+            window['start'] += 1
+        if window['count'] == 0:
+            window['sum'] = 0.0  # Reset float drift whenever a window empties
+
+    expired = source['windows']['7d']['start']
+    if expired:
+        del source['times'][:expired]
+        del source['scores'][:expired]
+        for window in source['windows'].values():
+            window['start'] -= expired
+
+def addItem(source, timestamp, score, now, rate):
+    if timestamp <= now - MAX_WINDOW:
+        return
+    advance(source, now)
+
+    position = bisect.bisect_right(source['times'], timestamp)
+    source['times'].insert(position, timestamp)
+    source['scores'].insert(position, score)
+    for name, seconds in WINDOWS.items():
+        window = source['windows'][name]
+        if timestamp > now - seconds:
+            window['sum'] += score
+            window['count'] += 1
+        else:
+            window['start'] += 1  # Late item older than this window sits before its start
+
+    # Exponential decay is anchored at the newest item, so late items only add a smaller weight
+    decay = source['decay']
+    if decay['at'] is None or timestamp > decay['at']:
+        factor = math.exp(-rate * (timestamp - decay['at'])) if decay['at'] is not None else 1.0
+        decay['sum'] *= factor
+        decay['weight'] *= factor
+        decay['at'] = timestamp
+    weight = math.exp(-rate * (decay['at'] - timestamp))
+    decay['sum'] += weight * score
+    decay['weight'] += weight
+
+def seedState(symbol, now, rate):
+    # One-time warm-up from the hot CSVs for symbols without state yet
+    state = {'sources': {}}
+    for source_name, (folder, time_field) in SOURCES.items():
+        source = state['sources'][source_name] = emptySource()
+        path = os.path.join(BASE_DIR, "logs", folder, f"{symbol.upper()}.csv")
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    addItem(source, parseTime(row[time_field]), float(row['sentiment_score']), now, rate)
+                except (KeyError, TypeError, ValueError):
+                    continue
+    return state
+
+def addItems(symbol, source_name, items):
+    """
+    Fold newly scored (timestamp, score) items of one source into the symbol's state.
+    """
+    if not items:
+        return
+    now = datetime.now(timezone.utc).timestamp()
+    rate = decayRate()
+
+    def mutate(state):
+        if not state:
+            # The CSV was just written with these items, so seeding already includes them
+            return seedState(symbol, now, rate)
+        source = state['sources'].setdefault(source_name, emptySource())
+        for timestamp, score in items:
+            addItem(source, timestamp, score, now, rate)
+        advance(source, now)
+        return state
+
+    os.makedirs(STATE_DIR, exist_ok=True)
+    storage.updateJson(statePath(symbol), mutate)
+
+def summarize(symbol):
+    """
+    Windowed means and counts plus the decayed mean and weight per source, as of now.
+    Read-only: only addItems writes state, so a symbol without state is seeded in memory.
+    """
+    now = datetime.now(timezone.utc).timestamp()
+    rate = decayRate()
+    state = storage.readJson(statePath(symbol), {}) or seedState(symbol, now, rate)
+
+    summary = {}
+    for source_name in SOURCES:
+        source = state['sources'].get(source_name) or emptySource()
+        advance(source, now)
+        for name in WINDOWS:
+            window = source['windows'][name]
+            summary[f"{source_name}_score_{name}"] = round(window['sum'] / window['count'], 4) if window['count'] else 0.0
+            summary[f"{source_name}_count_{name}"] = window['count']
+
+        decay = source['decay']
+        summary[f"{source_name}_score_decayed"] = round(decay['sum'] / decay['weight'], 4) if decay['weight'] else 0.0
+        elapsed = now - decay['at'] if decay['at'] is not None else 0.0
+        summary[f"{source_name}_weight_decayed"] = round(decay['weight'] * math.exp(-rate * elapsed), 4)
+    return summary
@@ -0,0 +1,90 @@
+import math
+from collections import deque
+from sortedcontainers import SortedList
+
+DEFAULT_WINDOWS = [60, 240, 1440]  # In minute ticks
+MIN_SAMPLES = 30
+Z_THRESHOLD = 3
+
+# (symbol, window) -> rolling state with Welford mean/variance and a sorted copy for quantiles;
+# SortedList keeps inserts, evictions and quantile lookups at O(log window)
+_windows = {}
+
+def flagColumns(windows):
+    return [f"outlier_{minutes}m" for minutes in windows]
+
+def newWindow(size):
+    return {'size': size, 'values': deque(), 'sorted': SortedList(), 'mean': 0.0, 'm2': 0.0}
+
+def pushValue(window, value):
+    values = window['values']
+    values.append(value)
+    window['sorted'].add(value)
+
+    delta = value - window['mean']
+    window['mean'] += delta / len(values)
+    window['m2'] += delta * (value - window['mean'])
+
+    if len(values) > window['size']:
+        oldest = values.popleft()
+        window['sorted'].remove(oldest)
+
+        # Reverse Welford update for the evicted value
+        n = len(values)
+        old_mean = window['mean']
+        window['mean'] -= (oldest - old_mean) / n
+        window['m2'] = max(window['m2'] - (oldest - old_mean) * (oldest - window['mean']), 0.0)
+
+def quantile(sorted_values, q):
+    # Linear interpolation, same as pandas' default
+    position = (len(sorted_values) - 1) * q
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def isWindowOutlier(window, value):
+    n = len(window['values'])
+    if n < MIN_SAMPLES:
+        return False
+
+    q1 = quantile(window['sorted'], 0.25)
+    q3 = quantile(window['sorted'], 0.75)
+    iqr = q3 - q1
+    iqr_flag = iqr > 0 and (value < q1 - 1.5 * iqr or value > q3 + 1.5 * iqr)
+
+    std = math.sqrt(window['m2'] / n)
+    z_flag = std > 0 and abs(value - window['mean']) / std > Z_THRESHOLD
+
+    return iqr_flag or z_flag
+
+def needsSeed(symbol, windows):
+    return any((symbol, minutes) not in _windows for minutes in windows)
+
+def seed(symbol, prices, windows):
+    # Rebuild state from already-logged ticks after a restart
+    for minutes in windows:
+        if (symbol, minutes) in _windows:
+            continue
+        window = newWindow(minutes)
+        for price in prices[-minutes:]:
+            pushValue(window, price)
+        _windows[(symbol, minutes)] = window
+
+def prune(symbols, windows):
+    # Drop the windows of coins this instance no longer logs and of window sizes no longer configured;
+    # a coin that comes back is seeded again from the logged ticks
+    for key in [key for key in _windows if key[0] not in symbols or key[1] not in windows]:
+        del _windows[key]
+
+def reset():
+    # Forget every window, so the next tick of each coin seeds again from the logged ticks
+    _windows.clear()
+
+def checkPrice(symbol, price, windows):
+    # Flags are computed against the window before the new tick is added
+    flags = {}
+    for minutes in windows:
+        window = _windows.setdefault((symbol, minutes), newWindow(minutes))
+        flags[f"outlier_{minutes}m"] = isWindowOutlier(window, price)
+        pushValue(window, price)
+    return flags
@@ -1,8 +1,19 @@
 import os
 import csv
 import pandas as pd
+from .. import cluster
+from .. import latestState
+from .. import metrics
+from . import sentimentAggregates
 from datetime import datetime
 
+AGGREGATE_FIELDS = [
+    f'{prefix}_{name}'
+    for name in list(sentimentAggregates.WINDOWS) + ['decayed']
+    for prefix in ['weighted_score', 'news_score', 'reddit_score'] + (
+        ['news_weight', 'reddit_weight'] if name == 'decayed' else ['news_count', 'reddit_count'])
+]
+
 def getAverageNewsSentiments(symbol):
     path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'logs', 'news_articles', f'{symbol.upper()}.csv'))
 
@@ -42,29 +53,50 @@ def getAverageRedditSentiments(symbol):
     return avg_score, count
 
 def log(results):
-    path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'logs', 'live_data', 'live_sentiment.csv'))
+    path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'logs', 'live_data', cluster.shardName('live_sentiment.csv')))
     
     os.makedirs(os.path.dirname(path), exist_ok=True)
     
-    with open(path, mode='w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=['symbol', 'weighted_score', 'news_score', 'reddit_score', 'news_count', 'reddit_count'])
+    with metrics.span('csv_write', file='live_sentiment'), open(path, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['symbol', 'weighted_score', 'news_score', 'reddit_score', 'news_count', 'reddit_count'] + AGGREGATE_FIELDS)
         writer.writeheader()
 
         for result in results:
             writer.writerow(result)
-
+    metrics.incCounter('rows_written_total', len(results), file='live_sentiment')
+
+    try:
+        latestState.updateSentiment(results)
+    except Exception as e:
+        print(f"[Analysis] Failed to update latest state: {e}")
+
+def weightScores(news_score, news_count, reddit_score, reddit_count):
+    if reddit_count == 0:
+        return news_score
+    elif news_count == 0:
+        return 0.0
+    else: 
+        return 0.8 * news_score + 0.2 * reddit_score
+
+def getAggregateSentiments(symbol):
+    # Windowed and decayed views from the incremental per-symbol state, combined with the same weighting
+    summary = sentimentAggregates.summarize(symbol)
+    for name in list(sentimentAggregates.WINDOWS) + ['decayed']:
+        count_name = 'weight' if name == 'decayed' else 'count'
+        summary[f'weighted_score_{name}'] = round(weightScores(
+            summary[f'news_score_{name}'], summary[f'news_{count_name}_{name}'],
+            summary[f'reddit_score_{name}'], summary[f'reddit_{count_name}_{name}'],
+        ), 4)
+    return summary
+
+@metrics.timed('weightedSentiment.computeWeightedSentiment')
 def computeWeightedSentiment(symbols):
     results = []
 
     for symbol in symbols:
         news_score, news_count = getAverageNewsSentiments(symbol)
         reddit_score, reddit_count = getAverageRedditSentiments(symbol)
-        if reddit_count == 0:
-            weighted_score = news_score
-        elif news_count == 0:
-            weighted_score = 0.0
-        else: 
-            weighted_score = 0.8 * news_score + 0.2 * reddit_score
+        weighted_score = weightScores(news_score, news_count, reddit_score, reddit_count)
 
         results.append({
             'symbol': symbol.upper(),
@@ -72,7 +104,8 @@ def computeWeightedSentiment(symbols):
             'news_score': round(news_score, 4),
             'reddit_score': round(reddit_score, 4),
             'news_count': news_count,
-            'reddit_count': reddit_count
+            'reddit_count': reddit_count,
+            **getAggregateSentiments(symbol),
         })
 
     log(results)
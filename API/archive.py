@@ -0,0 +1,139 @@
+import io
+import os
+import csv
+import gzip
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from . import configWatcher
+from . import metrics
+from . import storage
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVE_DIR = os.path.join(BASE_DIR, "logs", "archive")
+KINDS = ['live_data', 'hist_data', 'hist_data_backup', 'news_articles', 'reddit_posts']
+GZIP_LEVEL = 9
+ZSTD_LEVEL = 10
+
+def kindDir(kind):
+    return os.path.join(ARCHIVE_DIR, kind)
+
+def indexPath(kind):
+    return os.path.join(kindDir(kind), "index.json")
+
+def loadIndex(kind):
+    return storage.readJson(indexPath(kind), {})
+
+def appendMember(path, content):
+    # Each append is a complete gzip member / zstd frame, so a day file is never rewritten
+    if path.endswith('.zst'):
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(content)
+    else:
+        data = gzip.compress(content, GZIP_LEVEL)
+    with open(path, 'ab') as f:
+        f.write(data)
+
+def openMembers(path):
+    if path.endswith('.zst'):
+        raw = open(path, 'rb')
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True),
+                                encoding='utf-8', newline='')
+    return gzip.open(path, 'rt', encoding='utf-8', newline='')
+
+def archiveRows(kind, rows, fieldnames, time_field, unique_daily=False):
+    """
+    Append rows that aged out of a hot file to logs/archive/<kind>/<YYYY-MM-DD>.csv.gz
+    (.csv.zst when zstandard is installed), partitioned by the day of `time_field`.
+    With unique_daily, a symbol is archived at most once per day (daily history rows).
+    """
+    if not rows or not configWatcher.getConfig()["archive-aged-rows"]:
+        return
+
+    by_day = defaultdict(list)
+    for row in rows:
+        by_day[str(row[time_field])[:10]].append(row)
+
+    fieldnames = ['symbol'] + [field for field in fieldnames if field != 'symbol']
+    os.makedirs(kindDir(kind), exist_ok=True)
+    archived = 0
+
+    with storage.lockFile(indexPath(kind)):
+        index = loadIndex(kind)
+        for day, day_rows in sorted(by_day.items()):
+            entry = index.get(day) or {
+                'file': day + ('.csv.zst' if zstandard is not None else '.csv.gz'),
+                'fieldnames': fieldnames, 'time_field': time_field, 'rows': 0, 'symbols': [], 'first': None, 'last': None,
+            }
+            if unique_daily:
+                day_rows = [row for row in day_rows if row['symbol'] not in entry['symbols']]
+            if not day_rows:
+                continue
+
+            # The day file keeps the columns it was created with; the header is only in its first member
+            buffer = io.StringIO(newline='')
+            writer = csv.DictWriter(buffer, fieldnames=entry['fieldnames'], extrasaction='ignore')
+            if entry['rows'] == 0:
+                writer.writeheader()
+            writer.writerows(day_rows)
+            appendMember(os.path.join(kindDir(kind), entry['file']), buffer.getvalue().encode('utf-8'))
+
+            times = [str(row[time_field]) for row in day_rows]
+            entry['rows'] += len(day_rows)
+            entry['symbols'] = sorted(set(entry['symbols']) | {row['symbol'] for row in day_rows})
+            entry['first'] = min(times + ([entry['first']] if entry['first'] else []))
+            entry['last'] = max(times + ([entry['last']] if entry['last'] else []))
+            index[day] = entry
+            archived += len(day_rows)
+
+        storage.writeJson(indexPath(kind), index)
+
+    metrics.incCounter('rows_archived_total', archived, kind=kind)
+
+def parseTime(value):
+    # Archived rows use space-separated timestamps, queries usually the ISO 'T' form; naive times are UTC
+    parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def parseRange(start=None, end=None):
+    """
+    Parse ?start= / ?end= into aware datetimes; a date-only end includes that whole day.
+    Raises ValueError for values that are not ISO dates or timestamps.
+    """
+    start_time = parseTime(start) if start else None
+    end_time = parseTime(end) if end else None
+    if end_time is not None and len(end.strip()) == 10:
+        end_time += timedelta(days=1) - timedelta(microseconds=1)
+    return start_time, end_time
+
+def readArchive(kind, symbol=None, start=None, end=None):
+    # Lazily yields archived rows; only day files inside [start, end] that hold the symbol are opened
+    index = loadIndex(kind)
+    symbol = symbol.upper() if symbol else None
+    start_time, end_time = parseRange(start, end)
+    for day in sorted(index):
+        entry = index[day]
+        if (start_time and day < start_time.astimezone(timezone.utc).date().isoformat()) or \
+                (end_time and day > end_time.astimezone(timezone.utc).date().isoformat()):
+            continue
+        if symbol and symbol not in entry['symbols']:
+            continue
+
+        path = os.path.join(kindDir(kind), entry['file'])
+        if path.endswith('.zst') and zstandard is None:
+            print(f"[Archive] Skipping {path}: zstandard is not installed")
+            continue
+
+        time_field = entry['time_field']
+        with openMembers(path) as f:
+            for row in csv.DictReader(f):
+                if symbol and row['symbol'] != symbol:
+                    continue
+                if start_time or end_time:
+                    row_time = parseTime(row[time_field])
+                    if (start_time and row_time < start_time) or (end_time and row_time > end_time):
+                        continue
+                yield row
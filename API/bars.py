@@ -0,0 +1,130 @@
+import csv
+import os
+import threading
+from datetime import datetime, timezone
+from . import cluster
+from . import metrics
+from . import storage
+
+BAR_INTERVALS = {'5m': 300, '15m': 900, '1h': 3600}
+BAR_RETENTION_DAYS = 7
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BARS_DIR = os.path.join(BASE_DIR, "logs", "bars")
+FIELDNAMES = ['start', 'open', 'high', 'low', 'close', 'volume_24h', 'ticks']
+
+_open_bars = None
+_lock = threading.Lock()
+
+def formatStart(start):
+    return datetime.fromtimestamp(start, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+def barPath(symbol, interval):
+    return os.path.join(BARS_DIR, interval, f"{symbol}.csv")
+
+def openBarsPath():
+    return os.path.join(BARS_DIR, cluster.shardName("open_bars.json"))
+
+def loadOpenBars():
+    global _open_bars
+    if _open_bars is None:
+        _open_bars = storage.readJson(openBarsPath(), {})
+    return _open_bars
+
+def persistClosedBars(closed):
+    for symbol, interval, bar in closed:
+        path = barPath(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        is_new = not os.path.exists(path)
+
+        # Closed bars never change, so they are appended instead of rewriting the file
+        with metrics.span('csv_write', file='bars'), open(path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            if is_new:
+                writer.writeheader()
+            writer.writerow({**bar, 'start': formatStart(bar['start'])})
+        metrics.incCounter('rows_written_total', file='bars')
+
+        # Trim old bars once a day, when the first bar of a UTC day closes
+        if bar['start'] % 86400 == 0:
+            trimBars(path, bar['start'] - BAR_RETENTION_DAYS * 86400)
+
+def trimBars(path, cutoff):
+    cutoff_str = formatStart(cutoff)
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        rows = [row for row in csv.DictReader(f) if row['start'] >= cutoff_str]
+    with metrics.span('csv_write', file='bars'):
+        storage.writeCsv(path, FIELDNAMES, rows)
+
+def logTicks(entries, timestamp):
+    # Roll each tick into the open bar of every interval, closing bars whose bucket has ended
+    ts = int(timestamp.timestamp())
+    closed = []
+
+    with _lock:
+        open_bars = loadOpenBars()
+
+        for key, bar in list(open_bars.items()):
+            symbol, interval = key.split('|')
+            seconds = BAR_INTERVALS.get(interval)
+            if not cluster.ownsSymbol(symbol):
+                # A rebalance moved the symbol: its new owner opens its own bar for this bucket, so closing
+                # this partial one too would leave two rows with the same start
+                del open_bars[key]
+            elif seconds is None or bar['start'] + seconds <= ts:
+                if seconds is not None:
+                    closed.append((symbol, interval, bar))
+                del open_bars[key]
+
+        for entry in entries:
+            symbol = entry['symbol']
+            price = float(entry['price'])
+            volume = entry['total_volume']
+
+            for interval, seconds in BAR_INTERVALS.items():
+                key = f"{symbol}|{interval}"
+                bar = open_bars.get(key)
+                if bar is None:
+                    bar = {
+                        'start': ts - ts % seconds,
+                        'open': price,
+                        'high': price,
+                        'low': price,
+                        'close': price,
+                        'volume_24h': volume,
+                        'ticks': 0
+                    }
+                    open_bars[key] = bar
+
+                bar['high'] = max(bar['high'], price)
+                bar['low'] = min(bar['low'], price)
+                bar['close'] = price
+                bar['volume_24h'] = volume
+                bar['ticks'] += 1
+
+        os.makedirs(BARS_DIR, exist_ok=True)
+        persistClosedBars(closed)
+        storage.writeJson(openBarsPath(), open_bars)
+
+def getBars(symbol, interval, include_open=True):
+    symbol = symbol.upper()
+    path = barPath(symbol, interval)
+    bars = []
+
+    if os.path.exists(path):
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                for column in ['open', 'high', 'low', 'close', 'volume_24h']:
+                    row[column] = float(row[column])
+                row['ticks'] = int(row['ticks'])
+                bars.append(row)
+
+    if include_open:
+        # The open bar is read from disk so other processes (the server) see it too; after a
+        # rebalance the previous owner may still hold an older one, so the latest start wins
+        candidates = [storage.readJson(path, {}).get(f"{symbol}|{interval}") for path in cluster.shardFiles(BARS_DIR, "open_bars.json")]
+        bar = max((bar for bar in candidates if bar), key=lambda bar: bar['start'], default=None)
+        if bar:
+            bars.append({**bar, 'start': formatStart(bar['start'])})
+
+    return bars
@@ -0,0 +1,132 @@
+import os
+import glob
+import time
+import bisect
+import socket
+import hashlib
+from datetime import datetime, timezone
+from . import storage
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLUSTER_DIR = os.path.join(BASE_DIR, "logs", "cluster")
+MEMBERS_PATH = os.path.join(CLUSTER_DIR, "members.json")
+SNAPSHOT_PATH = os.path.join(CLUSTER_DIR, "markets.json")
+
+HEARTBEAT_TIMEOUT = 180  # Members missing three ticks are dropped and their symbols rebalanced
+VIRTUAL_NODES = 100
+SNAPSHOT_WAIT = 20
+SNAPSHOT_POLL = 0.5
+
+_state = {'instance': None, 'members': [], 'ring': [], 'ring_keys': []}
+
+def isSharded():
+    return _state['instance'] is not None
+
+def shardName(filename):
+    # Files every instance would rewrite whole get one copy per instance: live_data.csv -> live_data-<instance>.csv
+    if not isSharded():
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}-{_state['instance']}{ext}"
+
+def shardKey(key):
+    # Entries in files shared by all instances that each instance must keep for itself: r/foo -> foo@<instance>
+    if not isSharded():
+        return key
+    return f"{key}@{_state['instance']}"
+
+def liveMembers():
+    now = time.time()
+    members = storage.readJson(MEMBERS_PATH, {})
+    return {name for name, member in members.items() if now - member.get('heartbeat', 0) < HEARTBEAT_TIMEOUT}
+
+def shardFiles(directory, filename, include_departed=False):
+    # Unsharded file plus every instance's copy, for readers that union them. While any member heartbeats,
+    # copies of instances that left are skipped: their symbols moved to other instances and the stale rows
+    # would shadow or duplicate the new owner's. include_departed keeps them for readers seeding from old data
+    stem, ext = os.path.splitext(filename)
+    shards = sorted(glob.glob(os.path.join(directory, f"{stem}-*{ext}")))
+    members = None if include_departed else liveMembers()
+    if members:
+        shards = [path for path in shards if os.path.splitext(os.path.basename(path))[0][len(stem) + 1:] in members]
+    paths = [os.path.join(directory, filename)] + shards
+    return [path for path in paths if os.path.exists(path)]
+
+def hashKey(key):
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+def buildRing(members):
+    ring = sorted((hashKey(f"{member}#{i}"), member) for member in members for i in range(VIRTUAL_NODES))
+    _state['ring'] = ring
+    _state['ring_keys'] = [key for key, _ in ring]
+
+def ownerOf(symbol):
+    if not _state['ring']:
+        return _state['instance']
+    index = bisect.bisect(_state['ring_keys'], hashKey(symbol.upper())) % len(_state['ring'])
+    return _state['ring'][index][1]
+
+def ownsSymbol(symbol):
+    return not isSharded() or ownerOf(symbol) == _state['instance']
+
+def isLeader():
+    return not isSharded() or (_state['members'] or [_state['instance']])[0] == _state['instance']
+
+def join(instance):
+    _state['instance'] = instance
+    heartbeat()
+
+def heartbeat():
+    instance = _state['instance']
+    now = time.time()
+
+    def mutate(members):
+        members[instance] = {'heartbeat': now, 'pid': os.getpid(), 'host': socket.gethostname()}
+        return {name: member for name, member in members.items() if now - member['heartbeat'] < HEARTBEAT_TIMEOUT}
+
+    os.makedirs(CLUSTER_DIR, exist_ok=True)
+    members = sorted(storage.updateJson(MEMBERS_PATH, mutate))
+
+    # Consistent hashing: a join or leave only moves the symbols on the affected arcs of the ring
+    if members != _state['members']:
+        _state['members'] = members
+        buildRing(members)
+        print(f"[Cluster] {instance}: members {', '.join(members)}, leader {members[0]}")
+    return members
+
+def leave():
+    if not isSharded():
+        return
+    instance = _state['instance']
+
+    def mutate(members):
+        members.pop(instance, None)
+        return members
+
+    storage.updateJson(MEMBERS_PATH, mutate)
+    print(f"[Cluster] {instance} left the cluster")
+
+def sharedMarkets(num_to_search, currency, fetch):
+    # The leader fetches /coins/markets once per minute and followers read its snapshot
+    if not isSharded():
+        return fetch(num_to_search, currency)
+
+    minute = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+    def usable(snapshot):
+        return snapshot.get('minute') == minute and snapshot.get('currency') == currency \
+            and snapshot.get('per_page', 0) >= num_to_search
+
+    if not isLeader():
+        deadline = time.time() + SNAPSHOT_WAIT
+        while time.time() < deadline:
+            snapshot = storage.readJson(SNAPSHOT_PATH, {})
+            if usable(snapshot):
+                return snapshot['coins'][:num_to_search]
+            time.sleep(SNAPSHOT_POLL)
+        print(f"[Cluster] {_state['instance']}: no fresh markets snapshot from the leader, fetching directly")
+
+    coins = fetch(num_to_search, currency)
+    os.makedirs(CLUSTER_DIR, exist_ok=True)
+    storage.writeJson(SNAPSHOT_PATH, {'minute': minute, 'currency': currency, 'per_page': num_to_search, 'coins': coins})
+    return coins
@@ -2,19 +2,19 @@ import csv
 import os
 import requests
 import time
-import json
+from . import archive
+from . import bars
+from . import cluster
+from . import configWatcher
+from . import latestState
+from . import metrics
+from . import storage
 from .analysis import priceOutlier
+from .analysis import streamingOutlier
+from collections import defaultdict
 from datetime import datetime, timezone, timedelta
 
-def load_config():
-    config_path = os.path.join(os.path.dirname(__file__), '..', 'config.json')
-    try:
-        with open(config_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"[CoinGecko] Error loading config: {e}")
-        return None
-
+@metrics.timed('coingecko.log')
 def log(coins):
     now = datetime.now(timezone.utc)
     timestamp = now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
@@ -23,10 +23,11 @@ def log(coins):
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     log_dir = os.path.join(base_dir, "logs", "live_data")
     os.makedirs(log_dir, exist_ok=True)
-    log_path = os.path.join(log_dir, "live_data.csv")
+    log_path = os.path.join(log_dir, cluster.shardName("live_data.csv"))
 
-    # Load existing entries and filter out ones older than 24 hours
+    # Load existing entries and move ones older than 24 hours to the archive
     filtered_entries = []
+    aged_entries = []
     if os.path.exists(log_path):
         with open(log_path, 'r', newline='', encoding='utf-8') as f:
             reader = csv.DictReader(f)
@@ -35,28 +36,64 @@ def log(coins):
                     row_time = datetime.strptime(row['timestamp'], "%Y-%m-%d %H:%M:%S.%f").replace(tzinfo=timezone.utc)
                     if row_time >= cutoff:
                         filtered_entries.append(row)
+                    else:
+                        aged_entries.append(row)
                 except Exception:
                     continue  # Skip rows with invalid or missing timestamps
+        archive.archiveRows('live_data', aged_entries, reader.fieldnames or [], 'timestamp')
+
+    windows = configWatcher.getConfig()["outlier-windows"]
+
+    # Warm up rolling windows from the logged ticks for symbols seen for the first time
+    unseeded = {coin['symbol'].upper() for coin in coins if streamingOutlier.needsSeed(coin['symbol'].upper(), windows)}
+    if unseeded:
+        seed_rows = filtered_entries
+        if cluster.isSharded():
+            # Symbols moved here by a rebalance bring their recent ticks from the previous owner's file
+            seed_rows = list(filtered_entries)
+            for path in cluster.shardFiles(log_dir, "live_data.csv", include_departed=True):
+                if path != log_path:
+                    with open(path, 'r', newline='', encoding='utf-8') as f:
+                        seed_rows.extend(csv.DictReader(f))
+
+        seed_prices = defaultdict(list)
+        for row in seed_rows:
+            if row.get('symbol') in unseeded:
+                try:
+                    seed_prices[row['symbol']].append(float(row['price']))
+                except (KeyError, TypeError, ValueError):
+                    continue
+        for symbol in unseeded:
+            streamingOutlier.seed(symbol, seed_prices[symbol], windows)
 
     # Append new entries
+    new_entries = []
     for coin in coins:
-        # Replace this with actual outlier detection logic
-        price_outlier_flag = 't' if priceOutlier.isPriceOutlier(coin['symbol'].upper(), coin['current_price']) else 'f'
+        symbol = coin['symbol'].upper()
+        price = coin['current_price']
+
+        # Daily window against the reconciled history, intraday windows against recent ticks
+        outlier_flags = {'outlier_daily': priceOutlier.isPriceOutlier(symbol, price)}
+        outlier_flags.update(streamingOutlier.checkPrice(symbol, price, windows))
 
         entry = {
             'timestamp': timestamp,
-            'symbol': coin['symbol'].upper(),
-            'price': coin['current_price'],
+            'symbol': symbol,
+            'price': price,
             'market_cap': coin['market_cap'],
             'total_volume': coin['total_volume'],
             'price_change_pct_24h': coin.get('price_change_percentage_24h', 0.0),
             'market_cap_change_pct_24h': coin.get('market_cap_change_percentage_24h', 0.0),
-            'price_outlier_flag': price_outlier_flag
         }
-        filtered_entries.append(entry)
+        for column, flag in outlier_flags.items():
+            entry[column] = 't' if flag else 'f'
+        new_entries.append(entry)
+
+    streamingOutlier.prune({coin['symbol'].upper() for coin in coins}, windows)
+    filtered_entries.extend(new_entries)
 
     # Rewrite the CSV file with the updated list
-    with open(log_path, 'w', newline='', encoding='utf-8') as f:
+    with metrics.span('csv_write', file='live_data'), open(log_path, 'w', newline='', encoding='utf-8') as f:
         fieldnames = [
             'timestamp',
             'symbol',
@@ -65,11 +102,23 @@ def log(coins):
             'total_volume',
             'price_change_pct_24h',
             'market_cap_change_pct_24h',
-            'price_outlier_flag'
-        ]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+            'outlier_daily'
+        ] + streamingOutlier.flagColumns(windows)
+        # Rows logged under older window settings may carry other flag columns
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
         writer.writeheader()
         writer.writerows(filtered_entries)
+    metrics.incCounter('rows_written_total', len(filtered_entries), file='live_data')
+
+    try:
+        bars.logTicks(new_entries, now)
+    except Exception as e:
+        print(f"[CoinGecko] Failed to update bars: {e}")
+
+    try:
+        latestState.updatePrices(new_entries)
+    except Exception as e:
+        print(f"[CoinGecko] Failed to update latest state: {e}")
 
     print(f"[CoinGecko] Live data logged.")
 
@@ -80,14 +129,19 @@ def logHistorical(symbol, history):
     log_path = os.path.join(log_dir, f"{symbol}.csv")
 
     existing_data = {}
+    archive_fieldnames = []
 
     if os.path.exists(log_path):
         with open(log_path, 'r') as f:
             reader = csv.DictReader(f)
             for row in reader:
                 existing_data[row['date']] = row
+            archive_fieldnames = reader.fieldnames or []
 
     cutoff = datetime.now().date().toordinal() - 30
+    aged = [{**row, 'symbol': symbol} for date, row in existing_data.items()
+            if datetime.strptime(date, '%Y-%m-%d').date().toordinal() < cutoff]
+    archive.archiveRows('hist_data_backup', aged, archive_fieldnames, 'date', unique_daily=True)
     existing_data = {
         date: row for date, row in existing_data.items()
         if datetime.strptime(date, '%Y-%m-%d').date().toordinal() >= cutoff
@@ -105,17 +159,19 @@ def logHistorical(symbol, history):
                 'volume': entry['volumeto'],
             }
     
-    with open(log_path, 'w', newline='', encoding='utf-8') as f:
-        fieldnames = ['date', 'open', 'high', 'low', 'close', 'volume']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+    # Sort by date ascending
+    rows = [existing_data[date] for date in sorted(existing_data.keys())]
+    fieldnames = ['date', 'open', 'high', 'low', 'close', 'volume']
+    with metrics.span('csv_write', file='hist_data_backup'):
+        checksum = storage.writeCsv(log_path, fieldnames, rows)
+    metrics.incCounter('rows_written_total', len(rows), file='hist_data_backup')
 
-        # Sort by date ascending
-        for date in sorted(existing_data.keys()):
-            writer.writerow(existing_data[date])
+    if rows:
+        storage.updateManifest(log_dir, symbol, rows[-1]['date'], len(rows), checksum)
 
     print(f"[CoinGecko] Historical data fetched for: {symbol}")
 
+@metrics.timed('coingecko.fetchDailyHistory')
 def fetchDailyHistory(name, currency, days):
     url = f"https://api.coingecko.com/api/v3/coins/{name}/market_chart"
     params = {
@@ -124,14 +180,15 @@ def fetchDailyHistory(name, currency, days):
         'interval': 'daily'
     }
 
-    config = load_config()
-    api_key = config.get("coingecko_api_key")
+    api_key = configWatcher.getConfig()["coingecko_api_key"]
 
     headers = {
         'x-cg-demo-api-key': api_key
     }
 
     response = requests.get(url, params=params, headers=headers)
+    if response.status_code == 429:
+        metrics.incCounter('http_429_total', provider='coingecko')
     response.raise_for_status()
     data = response.json()
 
@@ -165,27 +222,107 @@ def fetchDailyHistory(name, currency, days):
 
     return history
 
-def collectHistoricalData(symbols, names, currency, days):
+@metrics.timed('coingecko.fetchDailySnapshot')
+def fetchDailySnapshot(ids, currency):
+    # One /coins/markets call covers up to 250 coins; its rolling 24h high/low/change
+    # give a full OHLCV row for the day when run at the daily update (23:59 UTC).
+    url = "https://api.coingecko.com/api/v3/coins/markets"
+    params = {
+        'vs_currency': currency.lower(),
+        'ids': ','.join(ids),
+        'per_page': 250,
+        'page': 1,
+        'sparkline': 'false'
+    }
+
+    api_key = configWatcher.getConfig()["coingecko_api_key"]
+
+    headers = {
+        'x-cg-demo-api-key': api_key
+    }
+
+    response = requests.get(url, params=params, headers=headers)
+    if response.status_code == 429:
+        metrics.incCounter('http_429_total', provider='coingecko')
+    response.raise_for_status()
+    coins = response.json()
+
+    now_ts = int(datetime.now(timezone.utc).timestamp())
+    snapshots = {}
+
+    for coin in coins:
+        close = coin.get('current_price')
+        if close is None:
+            continue
+
+        change = coin.get('price_change_24h') or 0.0
+        open_price = close - change
+        high = coin.get('high_24h') or max(open_price, close)
+        low = coin.get('low_24h') or min(open_price, close)
+
+        snapshots[coin['id']] = {
+            'time': now_ts,
+            'open': open_price,
+            'high': high,
+            'low': low,
+            'close': close,
+            'volumeto': coin.get('total_volume') or 0
+        }
+
+    return snapshots
+
+def collectHistoricalData(symbols, ids, currency, days):
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     hist_dir = os.path.join(base_dir, "logs/hist_data_backup")
     os.makedirs(hist_dir, exist_ok=True)
+    today = datetime.now(timezone.utc).date()
+    manifest = storage.loadManifest(hist_dir)
+
+    # Coins missing only today's row go through one batched markets call,
+    # anything with a longer gap falls back to a per-coin market_chart request
+    batch = {}
+    backfill = []
+
+    for symbol, coin_id in zip(symbols, ids):
+        fetch_days = days
+        last_date = storage.getLastDate(hist_dir, symbol.upper(), manifest)
+        if last_date:
+            last_date_obj = datetime.strptime(last_date, "%Y-%m-%d").date()
+            missing_days = (today - last_date_obj).days
+            if missing_days < 1:
+                print(f"[CoinGecko] Skipping {symbol}, data already up to date.")
+                metrics.incCounter('symbols_skipped_total', provider='coingecko')
+                continue
+            fetch_days = min(days, missing_days)
+
+        if fetch_days == 1:
+            batch[coin_id] = symbol
+        else:
+            backfill.append((symbol, coin_id, fetch_days))
+
+    batch_ids = list(batch.keys())
+    for i in range(0, len(batch_ids), 250):
+        chunk = batch_ids[i:i + 250]
+        try:
+            print(f"[CoinGecko] Fetching daily snapshot for {len(chunk)} coins")
+            snapshots = fetchDailySnapshot(chunk, currency)
+        except Exception as e:
+            print(f"[CoinGecko] Daily snapshot failed: {e}")
+            backfill.extend((batch[coin_id], coin_id, 1) for coin_id in chunk)
+            continue
 
-    for symbol, coin_id in zip(symbols, names):
-        file_path = os.path.join(hist_dir, f"{symbol.upper()}.csv")
-        if os.path.exists(file_path):
-            with open(file_path, 'r', newline='') as f:
-                reader = list(csv.DictReader(f))
-                if reader:
-                    last_date = reader[-1]['date']
-                    last_date_obj = datetime.strptime(last_date, "%Y-%m-%d").date()
-                    if (datetime.now(timezone.utc).date() - last_date_obj).days < 1:
-                        print(f"[CoinGecko] Skipping {symbol}, data already up to date.")
-                        continue
+        for coin_id in chunk:
+            if coin_id in snapshots:
+                logHistorical(batch[coin_id], [snapshots[coin_id]])
+            else:
+                backfill.append((batch[coin_id], coin_id, 1))
+        time.sleep(3)
 
+    for symbol, coin_id, fetch_days in backfill:
         try:
-            print(f"[CoinGecko] Fetching: {coin_id}")
-            history = fetchDailyHistory(coin_id, currency, days)
+            print(f"[CoinGecko] Fetching: {coin_id} ({fetch_days} days)")
+            history = fetchDailyHistory(coin_id, currency, fetch_days)
             logHistorical(symbol, history)
             time.sleep(3)
         except Exception as e:
-            print(f"Failed for {coin_id}: {e}")
\ No newline at end of file
+            print(f"Failed for {coin_id}: {e}")
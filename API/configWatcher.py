@@ -0,0 +1,128 @@
+import os
+import re
+import json
+import time
+import threading
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
+CHECK_INTERVAL = 1.0  # Seconds between mtime checks, so hot paths can call getConfig freely
+
+DEFAULTS = {
+    "top-number-of-coins": 50,
+    "selection-margin": 20,
+    "currency": "usd",
+    "historical-data-days": 90,
+    "outlier-windows": [60, 240, 1440],
+    "stable-coin-keywords": ["usd"],
+    "coins_ignored": [],
+    "coingecko_api_key": "",
+    "newsapi_key": [],
+    "media-interval": 15,
+    "cursor-resync-hours": 24,
+    "sentiment-half-life-hours": 6,
+    "metrics-port": 9100,
+    "profile-trigger": "",
+    "profile-iterations": 15,
+    "profile-mode": "cprofile",
+    "inference-backend": "torch",
+    "relevance-cascade": True,
+    "archive-aged-rows": True,
+    "KEYWORDS": ["crypto statistics or news", "money gain or loss"],
+    "BLOCKLIST": [],
+}
+
+POSITIVE_INTS = ["top-number-of-coins", "historical-data-days", "media-interval", "cursor-resync-hours", "profile-iterations",
+                 "sentiment-half-life-hours"]
+NON_NEGATIVE_INTS = ["selection-margin", "metrics-port"]
+STRING_LISTS = ["stable-coin-keywords", "coins_ignored", "newsapi_key", "KEYWORDS", "BLOCKLIST"]
+
+_lock = threading.Lock()
+_state = {'config': None, 'mtime': None, 'checked_at': 0.0}
+_subscribers = []
+
+def validate(raw):
+    if not isinstance(raw, dict):
+        raise ValueError("config.json must contain a JSON object")
+
+    config = {**DEFAULTS, **raw}
+    for key in POSITIVE_INTS + NON_NEGATIVE_INTS:
+        value = config[key]
+        minimum = 1 if key in POSITIVE_INTS else 0
+        if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+            raise ValueError(f"'{key}' must be an integer >= {minimum}, got {value!r}")
+    for key in STRING_LISTS:
+        if not isinstance(config[key], list) or not all(isinstance(item, str) for item in config[key]):
+            raise ValueError(f"'{key}' must be a list of strings")
+    if not config["KEYWORDS"]:
+        raise ValueError("'KEYWORDS' must not be empty")
+    if not isinstance(config["outlier-windows"], list) or \
+            not all(isinstance(window, int) and window > 0 for window in config["outlier-windows"]):
+        raise ValueError("'outlier-windows' must be a list of positive integers (minutes)")
+
+    # Lookups the hot paths would otherwise rebuild on every call
+    stable_keywords = sorted({keyword.lower() for keyword in config["stable-coin-keywords"]})
+    config['derived'] = {
+        'stable_pattern': re.compile('|'.join(map(re.escape, stable_keywords))) if stable_keywords else None,
+        'ignored_coins': frozenset(symbol.lower() for symbol in config["coins_ignored"]),
+        'blocklist': tuple(word.lower() for word in config["BLOCKLIST"]),
+    }
+    return config
+
+def reload():
+    previous = _state['config']
+    try:
+        mtime = os.stat(CONFIG_PATH).st_mtime_ns
+    except OSError as e:
+        # An editor replacing the file can leave it missing for a moment; the mtime is left alone
+        # so the file is read again as soon as it is back
+        if previous is None:
+            raise
+        print(f"[Config] Cannot stat config.json, keeping the previous config: {e}")
+        return None
+    if mtime == _state['mtime']:
+        return None
+
+    try:
+        with open(CONFIG_PATH, 'r') as f:
+            config = validate(json.load(f))
+    except (ValueError, OSError) as e:
+        # json.JSONDecodeError is a ValueError too
+        if previous is None:
+            raise
+        print(f"[Config] Invalid config.json, keeping the previous config: {e}")
+        _state['mtime'] = mtime
+        return None
+
+    _state['config'] = config
+    _state['mtime'] = mtime
+    return previous, config
+
+def getConfig():
+    # Stat the file at most once per CHECK_INTERVAL and parse it only when its mtime changed
+    changed = None
+    with _lock:
+        now = time.monotonic()
+        if _state['config'] is None or now - _state['checked_at'] >= CHECK_INTERVAL:
+            _state['checked_at'] = now
+            changed = reload()
+        config = _state['config']
+
+    if changed and changed[0] is not None:
+        notify(*changed)
+    return config
+
+def subscribe(callback):
+    # callback(previous, config) runs after every reload that changed the file
+    _subscribers.append(callback)
+
+def notify(previous, config):
+    changed_keys = sorted(key for key in config if key != 'derived' and previous.get(key) != config.get(key))
+    if not changed_keys:
+        return
+    print(f"[Config] Reloaded config.json, changed: {', '.join(changed_keys)}")
+    for callback in list(_subscribers):
+        try:
+            callback(previous, config)
+        except Exception as e:
+            print(f"[Config] Subscriber {getattr(callback, '__name__', callback)} failed: {e}")
@@ -2,6 +2,9 @@ import csv
 import os
 import requests
 import time
+from . import archive
+from . import metrics
+from . import storage
 from datetime import datetime, timezone
 
 SYMBOL_OVERRIDES = {
@@ -15,6 +18,7 @@ def log(symbol, history):
     log_path = os.path.join(log_dir, f"{symbol}.csv")
 
     existing_data = {}
+    archive_fieldnames = []
 
     # Step 1: Read existing data
     if os.path.exists(log_path):
@@ -22,9 +26,13 @@ def log(symbol, history):
             reader = csv.DictReader(f)
             for row in reader:
                 existing_data[row['date']] = row
+            archive_fieldnames = reader.fieldnames or []
 
-    # Step 2: Filter to last 30 days
+    # Step 2: Keep the last 30 days hot and move older rows to the archive
     cutoff = datetime.now().date().toordinal() - 30
+    aged = [{**row, 'symbol': symbol} for date, row in existing_data.items()
+            if datetime.strptime(date, '%Y-%m-%d').date().toordinal() < cutoff]
+    archive.archiveRows('hist_data', aged, archive_fieldnames, 'date', unique_daily=True)
     existing_data = {
         date: row for date, row in existing_data.items()
         if datetime.strptime(date, '%Y-%m-%d').date().toordinal() >= cutoff
@@ -43,18 +51,20 @@ def log(symbol, history):
                 'volume': entry['volumeto'],
             }
 
-    # Step 4: Write updated data back to CSV
-    with open(log_path, 'w', newline='', encoding='utf-8') as f:
-        fieldnames = ['date', 'open', 'high', 'low', 'close', 'volume']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+    # Step 4: Write updated data back to CSV, sorted by date ascending
+    rows = [existing_data[date] for date in sorted(existing_data.keys())]
+    fieldnames = ['date', 'open', 'high', 'low', 'close', 'volume']
+    with metrics.span('csv_write', file='hist_data'):
+        checksum = storage.writeCsv(log_path, fieldnames, rows)
+    metrics.incCounter('rows_written_total', len(rows), file='hist_data')
 
-        # Sort by date ascending
-        for date in sorted(existing_data.keys()):
-            writer.writerow(existing_data[date])
+    # Step 5: Record the last row in the directory manifest for freshness checks
+    if rows:
+        storage.updateManifest(log_dir, symbol, rows[-1]['date'], len(rows), checksum)
 
     print(f"[CryptoCompare] Historical data fetched for: {symbol}")
 
+@metrics.timed('cryptocompare.fetchDailyHistory')
 def fetchDailyHistory(symbol, currency, days):
     symbol = SYMBOL_OVERRIDES.get(symbol.upper(), symbol.upper())
 
@@ -66,6 +76,8 @@ def fetchDailyHistory(symbol, currency, days):
     }
 
     response = requests.get(url, params)
+    if response.status_code == 429:
+        metrics.incCounter('http_429_total', provider='cryptocompare')
     response.raise_for_status()
     data = response.json()
 
@@ -75,22 +87,25 @@ def collectHistoricalData(symbols, currency, days):
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     hist_dir = os.path.join(base_dir, "logs/hist_data")
     os.makedirs(hist_dir, exist_ok=True)
+    today = datetime.now(timezone.utc).date()
+    manifest = storage.loadManifest(hist_dir)
 
     for symbol in symbols:
-        file_path = os.path.join(hist_dir, f"{symbol.upper()}.csv")
-        if os.path.exists(file_path):
-            with open(file_path, 'r', newline='') as f:
-                reader = list(csv.DictReader(f))
-                if reader:
-                    last_date = reader[-1]['date']
-                    last_date_obj = datetime.strptime(last_date, "%Y-%m-%d").date()
-                    if (datetime.now(timezone.utc).date() - last_date_obj).days < 1:
-                        print(f"[CryptoCompare] Skipping {symbol}, data already up to date.")
-                        continue
-    
+        fetch_days = days
+        last_date = storage.getLastDate(hist_dir, symbol.upper(), manifest)
+        if last_date:
+            last_date_obj = datetime.strptime(last_date, "%Y-%m-%d").date()
+            missing_days = (today - last_date_obj).days
+            if missing_days < 1:
+                print(f"[CryptoCompare] Skipping {symbol}, data already up to date.")
+                metrics.incCounter('symbols_skipped_total', provider='cryptocompare')
+                continue
+            # Only request the days since the last logged date (histoday needs limit >= 1)
+            fetch_days = min(days, max(missing_days, 2))
+
         try:
-            print(f"[CryptoCompare] Fetching: {symbol}")
-            history = fetchDailyHistory(symbol, currency, days)
+            print(f"[CryptoCompare] Fetching: {symbol} ({fetch_days} days)")
+            history = fetchDailyHistory(symbol, currency, fetch_days)
             log(symbol, history)
             time.sleep(0.5)  # Avoid rate limit
         except Exception as e:
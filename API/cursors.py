@@ -0,0 +1,31 @@
+import os
+from datetime import datetime, timezone, timedelta
+from . import storage
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CURSORS_PATH = os.path.join(BASE_DIR, "logs", "cursors.json")
+DEFAULT_RESYNC_HOURS = 24
+
+def getCursor(kind, key, resync_hours=DEFAULT_RESYNC_HOURS):
+    # None means no usable high-water mark: fetch the full window and resync the cursor
+    entry = storage.readJson(CURSORS_PATH, {}).get(kind, {}).get(key)
+    if not entry or not entry.get('cursor'):
+        return None
+
+    last_full_sync = datetime.fromisoformat(entry['last_full_sync'])
+    if datetime.now(timezone.utc) - last_full_sync >= timedelta(hours=resync_hours):
+        return None
+    return entry
+
+def setCursor(kind, key, cursor, full_sync=False, **fields):
+    def mutate(data):
+        entry = data.setdefault(kind, {}).setdefault(key, {})
+        if cursor:
+            entry['cursor'] = cursor
+            entry.update(fields)
+        if full_sync or 'last_full_sync' not in entry:
+            entry['last_full_sync'] = datetime.now(timezone.utc).isoformat()
+        return data
+
+    os.makedirs(os.path.dirname(CURSORS_PATH), exist_ok=True)
+    storage.updateJson(CURSORS_PATH, mutate)
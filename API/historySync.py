@@ -0,0 +1,25 @@
+import time
+import threading
+from . import coingecko
+from . import cryptocompare
+from . import mergedHistory
+
+def syncHistoricalData(symbols, ids, currency, days):
+    # Both providers only request the days missing since each file's last date,
+    # and run side by side since they are rate limited independently
+    start = time.monotonic()
+
+    cc_thread = threading.Thread(target=cryptocompare.collectHistoricalData, args=(symbols, currency, days), daemon=True)
+    cg_thread = threading.Thread(target=coingecko.collectHistoricalData, args=(symbols, ids, currency, days), daemon=True)
+
+    cc_thread.start()
+    cg_thread.start()
+    cc_thread.join()
+    cg_thread.join()
+
+    try:
+        mergedHistory.buildMergedHistory(symbols)
+    except Exception as e:
+        print(f"[History] Failed to merge history: {e}")
+
+    print(f"[History] Synced {len(symbols)} coins in {time.monotonic() - start:.1f}s")
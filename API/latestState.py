@@ -0,0 +1,79 @@
+import os
+import threading
+from datetime import datetime, timezone
+from . import cluster
+from . import storage
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIVE_DIR = os.path.join(BASE_DIR, "logs", "live_data")
+
+_lock = threading.Lock()
+_table = None
+_cache = {'mtimes': None, 'symbols': {}}
+_cache_lock = threading.Lock()
+
+def latestPath():
+    return os.path.join(LIVE_DIR, cluster.shardName("latest.json"))
+
+def loadTable():
+    global _table
+    if _table is None:
+        _table = storage.readJson(latestPath(), {}).get('symbols', {})
+    return _table
+
+def persist(table):
+    os.makedirs(LIVE_DIR, exist_ok=True)
+    storage.writeJson(latestPath(), {'updated_at': datetime.now(timezone.utc).isoformat(), 'symbols': table})
+
+def updatePrices(entries):
+    # Called with the rows coingecko.log just wrote; coins that left the top N are dropped
+    with _lock:
+        table = loadTable()
+        current = {entry['symbol'] for entry in entries}
+        for symbol in list(table):
+            if symbol not in current:
+                del table[symbol]
+
+        for entry in entries:
+            row = table.setdefault(entry['symbol'], {'symbol': entry['symbol']})
+            flags = {column: value == 't' for column, value in entry.items() if column.startswith('outlier_')}
+            row.update({column: value for column, value in entry.items() if not column.startswith('outlier_')})
+            # Flag columns follow outlier-windows, so stale ones are replaced rather than merged
+            for column in [column for column in row if column.startswith('outlier_')]:
+                del row[column]
+            row.update(flags)
+            row['outlier'] = any(flags.values())
+
+        persist(table)
+
+def updateSentiment(results):
+    with _lock:
+        table = loadTable()
+        updated_at = datetime.now(timezone.utc).isoformat()
+        for result in results:
+            row = table.get(result['symbol'])
+            if row is None:
+                continue
+            row.update({field: value for field, value in result.items() if field != 'symbol'})
+            row['sentiment_updated_at'] = updated_at
+
+        persist(table)
+
+def readLatest():
+    # Server side: union every shard's table, re-read only when one of the files changed
+    paths = cluster.shardFiles(LIVE_DIR, "latest.json")
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append((path, os.path.getmtime(path)))
+        except FileNotFoundError:
+            continue
+
+    with _cache_lock:
+        if _cache['mtimes'] != mtimes:
+            symbols = {}
+            for path, _ in mtimes:
+                symbols.update(storage.readJson(path, {}).get('symbols', {}))
+            _cache['symbols'] = symbols
+            _cache['mtimes'] = mtimes
+        return _cache['symbols']
@@ -0,0 +1,116 @@
+import os
+import threading
+import pandas as pd
+from . import metrics
+from . import storage
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MERGED_DIR = os.path.join(BASE_DIR, "logs", "hist_merged")
+DATA_PATH = os.path.join(MERGED_DIR, "ohlcv.csv")
+STATE_PATH = os.path.join(MERGED_DIR, "state.json")
+
+# Ordered by precedence: CryptoCompare has real highs/lows, CoinGecko's are synthesized
+SOURCES = [
+    ('cryptocompare', os.path.join(BASE_DIR, "logs", "hist_data")),
+    ('coingecko', os.path.join(BASE_DIR, "logs", "hist_data_backup")),
+]
+COLUMNS = ['symbol', 'date', 'open', 'high', 'low', 'close', 'volume', 'source']
+
+_cache = {'mtime': None, 'frame': None, 'by_symbol': {}}
+_cache_lock = threading.Lock()
+
+def mergeSymbol(symbol):
+    frames = []
+    for rank, (source, directory) in enumerate(SOURCES):
+        path = os.path.join(directory, f"{symbol}.csv")
+        if not os.path.exists(path):
+            continue
+        df = pd.read_csv(path)
+        if df.empty:
+            continue
+        df['source'] = source
+        df['rank'] = rank
+        frames.append(df)
+
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+
+    # Keep the highest-precedence row for each date
+    merged = pd.concat(frames, ignore_index=True)
+    merged['date'] = pd.to_datetime(merged['date'])
+    merged = merged.sort_values(['date', 'rank']).drop_duplicates('date', keep='first')
+    merged = merged.set_index('date')[['open', 'high', 'low', 'close', 'volume', 'source']]
+
+    # Fill missing days with a flat bar at the previous close
+    full_range = pd.date_range(merged.index.min(), merged.index.max(), freq='D')
+    merged = merged.reindex(full_range)
+    gaps = merged['source'].isna()
+    if gaps.any():
+        merged['close'] = merged['close'].ffill()
+        for column in ['open', 'high', 'low']:
+            merged.loc[gaps, column] = merged.loc[gaps, 'close']
+        merged.loc[gaps, 'volume'] = 0.0
+        merged.loc[gaps, 'source'] = 'filled'
+
+    merged.index.name = 'date'
+    merged = merged.reset_index()
+    merged['date'] = merged['date'].dt.strftime('%Y-%m-%d')
+    merged.insert(0, 'symbol', symbol)
+    return merged[COLUMNS]
+
+def buildMergedHistory(symbols=None):
+    manifests = [storage.loadManifest(directory) for _, directory in SOURCES]
+    if symbols is None:
+        symbols = set().union(*manifests)
+    symbols = [symbol.upper() for symbol in symbols]
+
+    os.makedirs(MERGED_DIR, exist_ok=True)
+
+    with storage.lockFile(DATA_PATH):
+        state = storage.readJson(STATE_PATH, {})
+
+        # Only rebuild symbols whose source files changed since the last merge
+        changed = {}
+        for symbol in symbols:
+            checksums = [storage.getChecksum(directory, symbol, manifest) for (_, directory), manifest in zip(SOURCES, manifests)]
+            if checksums != state.get(symbol):
+                changed[symbol] = checksums
+
+        if not changed:
+            return
+
+        frames = []
+        if os.path.exists(DATA_PATH):
+            existing = pd.read_csv(DATA_PATH)
+            frames.append(existing[~existing['symbol'].isin(list(changed))])
+        frames.extend(mergeSymbol(symbol) for symbol in changed)
+
+        merged = pd.concat(frames, ignore_index=True).sort_values(['symbol', 'date'])
+        tmp_path = f"{DATA_PATH}.{os.getpid()}.tmp"
+        with metrics.span('csv_write', file='hist_merged'):
+            merged.to_csv(tmp_path, index=False)
+        metrics.incCounter('rows_written_total', len(merged), file='hist_merged')
+        os.replace(tmp_path, DATA_PATH)
+
+        state.update(changed)
+        storage.writeJson(STATE_PATH, state)
+
+    print(f"[History] Merged history rebuilt for {len(changed)} symbols")
+
+def loadMergedHistory():
+    try:
+        mtime = os.path.getmtime(DATA_PATH)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=COLUMNS)
+
+    with _cache_lock:
+        if _cache['mtime'] != mtime:
+            frame = pd.read_csv(DATA_PATH)
+            _cache['frame'] = frame
+            _cache['by_symbol'] = {symbol: group for symbol, group in frame.groupby('symbol')}
+            _cache['mtime'] = mtime
+        return _cache['frame']
+
+def getSymbolHistory(symbol):
+    loadMergedHistory()
+    return _cache['by_symbol'].get(symbol.upper())
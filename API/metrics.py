@@ -0,0 +1,127 @@
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PREFIX = "cryptologger_"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HELP = {
+    'span_seconds': ('histogram', "Time spent in instrumented collector code paths"),
+    'tick_lateness_seconds': ('histogram', "Delay between the scheduled minute and the collector waking up"),
+    'tick_lateness_last_seconds': ('gauge', "Lateness of the most recent collector tick"),
+    'tracked_coins': ('gauge', "Number of coins tracked in the latest tick"),
+    'http_429_total': ('counter', "HTTP 429 responses received per provider"),
+    'symbols_skipped_total': ('counter', "Symbols skipped because their data was already up to date"),
+    'rows_written_total': ('counter', "CSV rows written per file kind"),
+    'cascade_decisions_total': ('counter', "Relevance decisions made by the fast model or escalated to zero-shot"),
+    'cascade_audits_total': ('counter', "Confident fast-model decisions re-checked by zero-shot, by outcome"),
+    'rows_archived_total': ('counter', "Aged-out rows moved to the compressed archive, per kind"),
+    'near_duplicates_total': ('counter', "News articles that reused the sentiment score of a near-duplicate"),
+    'top_coin_changes_total': ('counter', "Coins that entered or left the tracked top coins"),
+}
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+
+def labelKey(labels):
+    return tuple(sorted(labels.items()))
+
+def incCounter(name, value=1, **labels):
+    key = (name, labelKey(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def setGauge(name, value, **labels):
+    with _lock:
+        _gauges[(name, labelKey(labels))] = value
+
+def observe(name, value, **labels):
+    key = (name, labelKey(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                histogram['buckets'][i] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+@contextmanager
+def span(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('span_seconds', time.perf_counter() - start, span=name, **labels)
+
+def timed(name):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def formatLabels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+def render():
+    # Prometheus text exposition format
+    lines = []
+    with _lock:
+        series = {}
+        for (name, labels), value in _counters.items():
+            series.setdefault(name, []).append((labels, value))
+        for (name, labels), value in _gauges.items():
+            series.setdefault(name, []).append((labels, value))
+        for (name, labels), histogram in _histograms.items():
+            series.setdefault(name, []).append((labels, dict(histogram, buckets=list(histogram['buckets']))))
+
+    for name in sorted(series):
+        metric_type, help_text = HELP.get(name, ('gauge', name))
+        full_name = PREFIX + name
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {metric_type}")
+
+        for labels, value in sorted(series[name], key=lambda item: item[0]):
+            if isinstance(value, dict):
+                for bound, count in zip(BUCKETS, value['buckets']):
+                    lines.append(f"{full_name}_bucket{formatLabels(labels, [('le', bound)])} {count}")
+                lines.append(f"{full_name}_bucket{formatLabels(labels, [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{full_name}_sum{formatLabels(labels)} {value['sum']}")
+                lines.append(f"{full_name}_count{formatLabels(labels)} {value['count']}")
+            else:
+                lines.append(f"{full_name}{formatLabels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        payload = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def startServer(port):
+    # Sidecar endpoint on the collector process, since the metrics live in its memory
+    server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[Metrics] Serving /metrics on port {port}")
+    return server
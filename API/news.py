@@ -2,20 +2,22 @@ import csv
 import os
 import requests
 import time
-import json
-from .analysis import sentiment
+from . import archive
+from . import configWatcher
+from . import cursors
+from . import metrics
+from .analysis import sentiment, nearDuplicate, sentimentAggregates
 from datetime import datetime, timezone, timedelta
 
 current_api_key_index = 0
 
-def load_config():
-    config_path = os.path.join(os.path.dirname(__file__), '..', 'config.json')
-    try:
-        with open(config_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"[NewsAPI] Error loading config: {e}")
-        return None
+def onConfigChange(previous, config):
+    # Restart the rotation when the key list is edited so the index never points past it
+    global current_api_key_index
+    if previous["newsapi_key"] != config["newsapi_key"]:
+        current_api_key_index = 0
+
+configWatcher.subscribe(onConfigChange)
 
 def log(symbol, articles):
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -24,6 +26,7 @@ def log(symbol, articles):
     log_path = os.path.join(log_dir, f"{symbol}.csv")
 
     existing_entries = []
+    aged_entries = []
     seen_urls = set()
     one_week_ago = datetime.now(timezone.utc) - timedelta(days=7)
 
@@ -39,9 +42,14 @@ def log(symbol, articles):
                         row['published_at'] = published_at
                         existing_entries.append(row)
                         seen_urls.add(row['url'])  # Use URL as a unique identifier
+                    else:
+                        aged_entries.append({**row, 'symbol': symbol})
                 except Exception as e:
                     continue  # skip malformed rows
+        archive.archiveRows('news_articles', aged_entries, reader.fieldnames or [], 'published_at')
 
+    duplicates = 0
+    scored = []
     for article in articles:
         url = article.get('url', '')
         if url in seen_urls:
@@ -49,8 +57,7 @@ def log(symbol, articles):
 
         title = article.get('title', '')
         source_name = article.get('source', {}).get('name', '')
-        content = article.get('content', '')
-        sentiment_score = sentiment.getSentimentScore(f"{title} {source_name} {content}")
+        content = article.get('content', '') or ''
         published_at_str = article.get('publishedAt', '')
 
         try:
@@ -61,6 +68,18 @@ def log(symbol, articles):
         if published_at < one_week_ago:
             continue  # Skip if too old
 
+        # Syndicated copies share the score of the first article in their group instead of rerunning FinBERT
+        signature, duplicate = nearDuplicate.findDuplicate(f"{title} {content}")
+        if duplicate is not None:
+            sentiment_score = duplicate['score']
+            duplicates += 1
+        else:
+            sentiment_score = sentiment.getSentimentScore(f"{title} {source_name} {content}")
+            if signature is not None:
+                nearDuplicate.add(signature, url, published_at, sentiment_score)
+        seen_urls.add(url)
+        scored.append((published_at.timestamp(), sentiment_score))
+
         existing_entries.append({
             'title': title,
             'source_name': source_name,
@@ -73,13 +92,15 @@ def log(symbol, articles):
     existing_entries.sort(key=lambda x: x['published_at'], reverse=True)
 
     # Write to CSV (excluding _parsed_published_at)
-    with open(log_path, 'w', newline='', encoding='utf-8') as f:
+    with metrics.span('csv_write', file='news_articles'), open(log_path, 'w', newline='', encoding='utf-8') as f:
         fieldnames = ['title', 'source_name', 'url', 'published_at', 'sentiment_score']
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(existing_entries)
-
-    print(f"[NewsAPI] News data logged for: {symbol}")
+    metrics.incCounter('rows_written_total', len(existing_entries), file='news_articles')
+    metrics.incCounter('near_duplicates_total', duplicates)
+    sentimentAggregates.addItems(symbol, 'news', scored)
+    print(f"[NewsAPI] News data logged for: {symbol}" + (f" ({duplicates} near-duplicates reused a score)" if duplicates else ""))
 
 def isRelevantArticle(article, target_coin_name, target_symbol, other_crypto_symbols):
     # Filter articles to ensure they're primarily about the target cryptocurrency
@@ -133,11 +154,10 @@ def isRelevantArticle(article, target_coin_name, target_symbol, other_crypto_sym
 def getNextAPIKey():
     """Get the next API key in rotation"""
     global current_api_key_index
-    config = load_config()
-    if not config or 'newsapi_key' not in config:
+    api_keys = configWatcher.getConfig()['newsapi_key']
+    if not api_keys:
         return None
     
-    api_keys = config['newsapi_key']
     if current_api_key_index >= len(api_keys):
         current_api_key_index = 0
     
@@ -145,18 +165,22 @@ def getNextAPIKey():
     current_api_key_index += 1
     return api_key
 
+@metrics.timed('news.fetchCoinNews')
 def fetchCoinNews(coin_name, coin_symbol, other_crypto_symbols):
+    # Returns (relevant articles, cursor update); the caller saves the cursor only once the articles are logged
     url = "https://newsapi.org/v2/everything"
 
+    config = configWatcher.getConfig()
+
+    # Only ask for articles newer than the last one seen, with a full 15-day window on periodic resyncs
+    cursor = cursors.getCursor('news', coin_symbol.upper(), config["cursor-resync-hours"])
     now = datetime.now(timezone.utc)
-    from_date = (now - timedelta(days=15)).strftime('%Y-%m-%dT%H:%M:%SZ')  # 15 days
+    from_date = cursor['cursor'] if cursor else (now - timedelta(days=15)).strftime('%Y-%m-%dT%H:%M:%SZ')  # 15 days
     to_date = now.strftime('%Y-%m-%dT%H:%M:%SZ')
     
     # Dynamic search query using coin name and symbol
     search_query = f'"{coin_name}" OR "{coin_symbol}"'
     
-    config = load_config()
-    
     api_keys = config['newsapi_key']
     max_retries = len(api_keys)
     
@@ -164,7 +188,7 @@ def fetchCoinNews(coin_name, coin_symbol, other_crypto_symbols):
         api_key = getNextAPIKey()
         if not api_key:
             print("[NewsAPI] No API keys available")
-            return []
+            return [], None
         
         params = {
             'q': search_query,
@@ -180,12 +204,17 @@ def fetchCoinNews(coin_name, coin_symbol, other_crypto_symbols):
             response = requests.get(url, params=params)
             
             if response.status_code == 429:
+                metrics.incCounter('http_429_total', provider='newsapi')
                 print(f"[NewsAPI] API key {current_api_key_index}/{len(api_keys)} hit rate limit, trying next key...")
                 continue
             
             response.raise_for_status()
             data = response.json()
             articles = data.get("articles", [])
+
+            # Advance past every returned article, relevant or not, so none is transferred again
+            latest = max((article.get('publishedAt') or '' for article in articles), default='')
+            cursor_update = {'cursor': latest, 'full_sync': cursor is None}
             
             # Filter articles to ensure relevancy
             filtered_articles = [
@@ -194,7 +223,7 @@ def fetchCoinNews(coin_name, coin_symbol, other_crypto_symbols):
             ]
             
             print(f"[NewsAPI] {len(filtered_articles)}/{len(articles)} relevant articles for {coin_symbol} with API key {current_api_key_index}")
-            return filtered_articles
+            return filtered_articles, cursor_update
             
         except requests.exceptions.HTTPError as e:
             if response.status_code == 429:
@@ -208,7 +237,7 @@ def fetchCoinNews(coin_name, coin_symbol, other_crypto_symbols):
             continue
     
     print("[NewsAPI] All API keys exhausted or failed")
-    return []
+    return [], None
 
 def fetchCryptoNews(coins, names):
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -218,17 +247,25 @@ def fetchCryptoNews(coins, names):
     # Create list of all symbols for filtering
     all_symbols = coins + names
     
-    for coin, name in zip(coins, names):
-        file_path = os.path.join(hist_dir, f"{coin.upper()}.csv")
-        if os.path.exists(file_path):
-            last_modified = datetime.fromtimestamp(os.path.getmtime(file_path), tz=timezone.utc)
-            if datetime.now(timezone.utc) - last_modified < timedelta(minutes=15):
-                print(f"[NewsAPI] Skipping {name} ({coin}), news already up to date.")
-                continue
+    try:
+        for coin, name in zip(coins, names):
+            file_path = os.path.join(hist_dir, f"{coin.upper()}.csv")
+            if os.path.exists(file_path):
+                last_modified = datetime.fromtimestamp(os.path.getmtime(file_path), tz=timezone.utc)
+                if datetime.now(timezone.utc) - last_modified < timedelta(minutes=15):
+                    print(f"[NewsAPI] Skipping {name} ({coin}), news already up to date.")
+                    metrics.incCounter('symbols_skipped_total', provider='newsapi')
+                    continue
 
-        # Get other crypto symbols for filtering (exclude current coin)
-        other_symbols = [s for s in all_symbols if s.lower() not in [coin.lower(), name.lower()]]
-        
-        data = fetchCoinNews(name, coin, other_symbols)
-        log(coin, data)
-        time.sleep(2)  # Add 2 second delay between requests
\ No newline at end of file
+            # Get other crypto symbols for filtering (exclude current coin)
+            other_symbols = [s for s in all_symbols if s.lower() not in [coin.lower(), name.lower()]]
+            
+            data, cursor_update = fetchCoinNews(name, coin, other_symbols)
+            log(coin, data)
+            # Only now, so articles that log() did not get to score and write are fetched again
+            if cursor_update:
+                cursors.setCursor('news', coin.upper(), **cursor_update)
+            time.sleep(2)  # Add 2 second delay between requests
+    finally:
+        # One write of the MinHash index per cycle instead of one per coin
+        nearDuplicate.save()
\ No newline at end of file
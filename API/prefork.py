@@ -0,0 +1,91 @@
+import gc
+import os
+import sys
+import time
+import random
+import signal
+import traceback
+
+RESTART_DELAY = 5  # Seconds before a crashed worker is forked again
+
+def prepareFork():
+    # Everything the workers share (models, tokenizers, config) must be loaded before this is called,
+    # and the parent must not have started any threads
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+    gc.collect()
+    # Frozen objects are skipped by the collector, so a collection in a worker never writes to
+    # the parent's pages and the model objects stay shared copy-on-write
+    gc.freeze()
+
+def limitThreads(num_workers):
+    # Each worker gets its share of the cores instead of every worker spinning up one intra-op thread per core
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // num_workers))
+
+def forkWorker(index, num_workers, target):
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Child: never returns into the parent's code, and skips the atexit handlers inherited from it
+    code = 0
+    try:
+        random.seed()
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        limitThreads(num_workers)
+        target(index)
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 0
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+def run(num_workers, target):
+    """
+    Fork num_workers processes that each call target(index), sharing everything loaded so far copy-on-write.
+    Crashed workers are forked again from the parent, so a restart does not reload any model.
+    SIGTERM/SIGINT are forwarded to the workers and the call returns once all of them exited.
+    """
+    prepareFork()
+    children = {}
+    state = {'stopping': False}
+
+    def stop(signum, frame):
+        state['stopping'] = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(num_workers):
+        children[forkWorker(index, num_workers, target)] = index
+    print(f"[Prefork] Parent {os.getpid()} started {num_workers} workers: {', '.join(map(str, children))}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        index = children.pop(pid, None)
+        if index is None or state['stopping']:
+            continue
+
+        print(f"[Prefork] Worker {index} (pid {pid}) exited with code {os.waitstatus_to_exitcode(status)}, restarting")
+        time.sleep(RESTART_DELAY)
+        if not state['stopping']:
+            children[forkWorker(index, num_workers, target)] = index
+
+    print("[Prefork] All workers exited")
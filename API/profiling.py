@@ -0,0 +1,166 @@
+import os
+import sys
+import pstats
+import signal
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILES_DIR = os.path.join(BASE_DIR, "logs", "profiles")
+SAMPLE_INTERVAL = 0.01
+
+_state = {
+    'pending': 0,
+    'remaining': 0,
+    'iterations': 15,
+    'mode': 'cprofile',
+    'last_trigger': None,
+    'label': None,
+    'profiler': None,
+    'sampler': None,
+    'memory_watchers': 0,
+    'owns_tracing': False,
+}
+_memory_lock = threading.Lock()
+
+def reportPath(label, suffix):
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    return os.path.join(PROFILES_DIR, f"{label}_{suffix}")
+
+def requestProfile(iterations=None):
+    _state['pending'] = iterations or _state['iterations']
+    print(f"[Profiler] Profiling requested for the next {_state['pending']} iterations")
+
+def installSignalHandler():
+    # `kill -USR1 <pid>` profiles the next iterations without touching config.json
+    if not hasattr(signal, 'SIGUSR1'):
+        return
+    signal.signal(signal.SIGUSR1, lambda signum, frame: requestProfile())
+
+def checkConfig(config):
+    _state['iterations'] = config.get("profile-iterations", 15)
+    _state['mode'] = config.get("profile-mode", "cprofile")
+
+    # Changing profile-trigger to a new value starts a profile; the startup value does not
+    trigger = config.get("profile-trigger")
+    if _state['last_trigger'] is None:
+        _state['last_trigger'] = trigger or ""
+    elif trigger and trigger != _state['last_trigger']:
+        _state['last_trigger'] = trigger
+        requestProfile()
+
+def sampleStacks(stop_event, counts):
+    # Low-overhead sampler over every thread, written as collapsed stacks
+    own_id = threading.get_ident()
+    names = {}
+    while not stop_event.wait(SAMPLE_INTERVAL):
+        for thread in threading.enumerate():
+            names[thread.ident] = thread.name
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            counts[";".join(reversed(stack))] += 1
+
+def beginIteration():
+    if _state['remaining'] == 0 and _state['pending']:
+        _state['remaining'] = _state['pending']
+        _state['pending'] = 0
+        _state['label'] = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+        if _state['mode'] == 'sample':
+            stop_event = threading.Event()
+            counts = Counter()
+            thread = threading.Thread(target=sampleStacks, args=(stop_event, counts), daemon=True)
+            thread.start()
+            _state['sampler'] = (stop_event, counts, thread)
+        else:
+            _state['profiler'] = cProfile.Profile()
+
+        print(f"[Profiler] Started {_state['mode']} profile {_state['label']}")
+
+    if _state['profiler'] is not None:
+        _state['profiler'].enable()
+
+def endIteration():
+    if _state['remaining'] == 0:
+        return
+
+    if _state['profiler'] is not None:
+        _state['profiler'].disable()
+
+    _state['remaining'] -= 1
+    if _state['remaining'] == 0:
+        finishProfile()
+
+def finishProfile():
+    label = _state['label']
+
+    if _state['profiler'] is not None:
+        profiler = _state['profiler']
+        profiler.dump_stats(reportPath(label, "cprofile.prof"))
+        with open(reportPath(label, "cprofile.txt"), 'w') as f:
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(60)
+        _state['profiler'] = None
+
+    if _state['sampler'] is not None:
+        stop_event, counts, thread = _state['sampler']
+        stop_event.set()
+        thread.join()
+        with open(reportPath(label, "samples.folded"), 'w') as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        _state['sampler'] = None
+
+    print(f"[Profiler] Profile {label} written to {PROFILES_DIR}")
+
+def beginMediaCycle():
+    # Call before the media threads are started, so their allocations land after the first snapshot;
+    # returns None when no profile is running
+    if _state['remaining'] == 0:
+        return None
+
+    with _memory_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            _state['owns_tracing'] = True
+        _state['memory_watchers'] += 1
+        return _state['label'], tracemalloc.take_snapshot()
+
+def watchMediaCycle(cycle, threads):
+    # Snapshot memory again once all media threads started after beginMediaCycle() have finished
+    if cycle is None:
+        return
+
+    label, before = cycle
+
+    def compare():
+        for thread in threads:
+            if thread is not None:
+                thread.join()
+
+        # Tracing stays on until the last overlapping media cycle has been snapshotted
+        with _memory_lock:
+            after = tracemalloc.take_snapshot()
+            _state['memory_watchers'] -= 1
+            if _state['memory_watchers'] == 0 and _state['owns_tracing']:
+                tracemalloc.stop()
+                _state['owns_tracing'] = False
+
+        stamp = datetime.now(timezone.utc).strftime("%H%M%S")
+        with open(reportPath(label, f"tracemalloc_{stamp}.txt"), 'w') as f:
+            traced = sum(stat.size for stat in after.statistics('filename'))
+            f.write(f"Media cycle memory growth, top 40 allocation sites (traced {traced / 1e6:.1f} MB)\n\n")
+            for stat in after.compare_to(before, 'lineno')[:40]:
+                f.write(f"{stat}\n")
+        print(f"[Profiler] Media cycle memory snapshot written for {label}")
+
+    threading.Thread(target=compare, daemon=True).start()
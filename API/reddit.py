@@ -3,12 +3,23 @@ import os
 import requests
 import time
 from collections import defaultdict
-from transformers import pipeline
+from . import archive
+from . import cluster
+from . import cursors
+from . import metrics
+from .analysis import inference
+from .analysis import relevanceCascade
 from .analysis import sentiment
+from .analysis import sentimentAggregates
 from .maps.subreddit_map import known_subs
 from datetime import datetime, timezone, timedelta
 
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+MULTIREDDIT_SIZE = 25  # Subreddits combined into one r/a+b+c listing
+MAX_PAGES = 10
+REQUEST_DELAY = 2
+RESYNC_TOP_POSTS = 50
+
+classifier = inference.loadPipeline("zero-shot-classification", "facebook/bart-large-mnli")
 
 def log(symbol, posts):
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -17,10 +28,11 @@ def log(symbol, posts):
     log_path = os.path.join(log_dir, f"{symbol}.csv")
 
     existing_entries = []
+    aged_entries = []
     seen_ids = set()
     one_month_ago = datetime.now(timezone.utc) - timedelta(days=30)
 
-    # Read existing posts and filter for last 30 days
+    # Read existing posts, keep the last 30 days and move older ones to the archive
     if os.path.exists(log_path):
         with open(log_path, 'r', newline='', encoding='utf-8') as f:
             reader = csv.DictReader(f)
@@ -30,10 +42,14 @@ def log(symbol, posts):
                     if created >= one_month_ago:
                         existing_entries.append(row)
                         seen_ids.add(row['post_id'])  # track IDs to avoid duplicates
+                    else:
+                        aged_entries.append({**row, 'symbol': symbol})
                 except Exception:
                     continue  # skip malformed rows
+        archive.archiveRows('reddit_posts', aged_entries, reader.fieldnames or [], 'created_utc')
 
     # Append only new posts (no duplicates)
+    scored = []
     for post in posts:
         post_id = post.get('id', '')
         if post_id in seen_ids:
@@ -55,25 +71,30 @@ def log(symbol, posts):
 
         existing_entries.append(new_entry)
         seen_ids.add(post_id)  # add new ID
+        scored.append((created_utc, sentiment_score))
 
     # Sort entries newest first
     existing_entries.sort(key=lambda x: datetime.fromisoformat(x['created_utc']), reverse=True)
 
     # Write all entries back to CSV
-    with open(log_path, 'w', newline='', encoding='utf-8') as f:
+    with metrics.span('csv_write', file='reddit_posts'), open(log_path, 'w', newline='', encoding='utf-8') as f:
         fieldnames = ['post_id', 'subreddit', 'title', 'score', 'created_utc', 'sentiment_score']
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(existing_entries)
+    metrics.incCounter('rows_written_total', len(existing_entries), file='reddit_posts')
+    sentimentAggregates.addItems(symbol, 'reddit', scored)
     
     print(f"[Reddit] Reddit posts logged for: {symbol}")
 
+@metrics.timed('reddit.get_account_creation_utc')
 def get_account_creation_utc(username):
     headers = {'User-Agent': 'CryptoTextCollector/1.0'}
     url = f'https://www.reddit.com/user/{username}/about.json'
     try:
         response = requests.get(url, headers=headers)
         if response.status_code == 429:
+            metrics.incCounter('http_429_total', provider='reddit')
             print(f"[Reddit] Rate limit hit. Skipping {username}.")
             return None
         if response.status_code == 200:
@@ -90,6 +111,7 @@ def isRelevant(text, blocklist):
         return False
     return True
 
+@metrics.timed('bart.zero_shot')
 def isZeroShotRelevant(text, keywords, threshold=0.4):
     result = classifier(text, candidate_labels=keywords, multi_label=False)
     top_label = result["labels"][0]
@@ -116,88 +138,176 @@ def isProbablyBot(post, posts_by_author, karma_threshold=5, ratio_threshold=0.3,
 
     return (is_low_karma and is_low_ratio and is_new_account) or posts_too_frequent
 
-def fetchSubreddit(subreddit, config):
-    url = f"https://www.reddit.com/r/{subreddit}/top.json"
+def filterPosts(posts, config):
+    posts_by_author = defaultdict(list)
+    for post in posts:
+        author = post.get('author')
+        if author and author != '[deleted]':
+            time.sleep(0.5)
+            post['author_created_utc'] = get_account_creation_utc(author)
+        else:
+            post['author_created_utc'] = None
+        posts_by_author[author].append(post)
+
+    filtered = []
+    for post in posts:
+        combined_text = (post.get('title', '') + ' ' + post.get('selftext', '')).lower()
+        
+        if not isRelevant(combined_text, config['derived']['blocklist']):
+            continue
+        if config["relevance-cascade"]:
+            relevant = relevanceCascade.isRelevant(combined_text, config["KEYWORDS"], lambda text: isZeroShotRelevant(text, config["KEYWORDS"]))
+        else:
+            relevant = isZeroShotRelevant(combined_text, config["KEYWORDS"])
+        if not relevant:
+            continue
+        if isProbablyBot(post, posts_by_author):
+            continue
+        
+        filtered.append(post)
+
+    return filtered
+
+def fetchListing(subreddits, oldest_needed):
+    """
+    Page the combined r/a+b+c listing back to oldest_needed. Returns the posts and the creation time the
+    listing reaches back to (0 when it got to oldest_needed), or None on a 429 or any other error.
+    """
+    url = f"https://www.reddit.com/r/{'+'.join(subreddits)}/new.json"
     headers = {'User-Agent': 'CryptoTextCollector/1.0'}
-    params = {'limit': 50, 't': 'week'}
 
     try:
-        response = requests.get(url, params=params, headers=headers)
+        children, after = [], None
+        for page in range(MAX_PAGES):
+            params = {'limit': 100}
+            if after:
+                params['after'] = after
+            response = requests.get(url, params=params, headers=headers)
+
+            # A partial listing would move the cursors past posts that were never read
+            if response.status_code == 429:
+                metrics.incCounter('http_429_total', provider='reddit')
+                print(f"[Reddit] Rate limit hit. Skipping {', '.join(subreddits)}.")
+                return None
+
+            response.raise_for_status()
+            listing = response.json().get('data', {})
+            page_posts = [item.get('data', {}) for item in listing.get('children', [])]
+            children.extend(page_posts)
+
+            after = listing.get('after')
+            oldest_fetched = min((post.get('created_utc', 0) for post in page_posts), default=0)
+            if not after or not page_posts or oldest_fetched <= oldest_needed:
+                return children, 0
+            time.sleep(REQUEST_DELAY)
 
-        if response.status_code == 429:
-            print(f"[Reddit] Rate limit hit. Skipping {subreddit}.")
-            return None
+    except Exception as e:
+        print(f"[Reddit] API error for r/{'+'.join(subreddits)}: {e}")
+        return None
+
+    # MAX_PAGES ran out before the listing reached oldest_needed
+    return children, oldest_fetched
+
+@metrics.timed('reddit.fetchMultireddit')
+def fetchMultireddit(subreddits, config):
+    """
+    Fetch new posts of a group of subreddits through one combined listing, paged back to the oldest cursor.
+    Returns {subreddit: filtered posts}; subreddits that could not be fetched are missing, and the whole
+    result is None when the combined listing failed. Cursors only move for subreddits returned.
+    """
+    resync_hours = config["cursor-resync-hours"]
+    three_days_ago = datetime.now(timezone.utc).timestamp() - 3 * 86400
+
+    # A subreddit shared by coins on different instances (MakerDAO: DAI and MKR) is fetched by each of them,
+    # so every instance keeps its own cursor instead of moving one past posts the other has not logged
+    group_cursors = {subreddit: cursors.getCursor('reddit', cluster.shardKey(subreddit), resync_hours) for subreddit in subreddits}
+    since = {
+        subreddit.lower(): max(cursor['created_utc'], three_days_ago) if cursor else three_days_ago
+        for subreddit, cursor in group_cursors.items()
+    }
+
+    listing = fetchListing(subreddits, min(since.values()))
+    if listing is None:
+        return None
+    children, covered_from = listing
+
+    results = {}
+    uncovered = [subreddit for subreddit in subreddits if since[subreddit.lower()] < covered_from]
+    if uncovered and len(subreddits) > 1:
+        # Busy subreddits filled every page before the quieter ones reached their cursors, so the quieter
+        # ones are paged again in smaller groups instead of moving their cursors past unread posts
+        parts = [uncovered] if len(uncovered) < len(subreddits) else \
+            [uncovered[:len(uncovered) // 2], uncovered[len(uncovered) // 2:]]
+        for part in parts:
+            time.sleep(REQUEST_DELAY)
+            results.update(fetchMultireddit(part, config) or {})
+        group_cursors = {subreddit: cursor for subreddit, cursor in group_cursors.items() if subreddit not in uncovered}
+    elif uncovered:
+        # The listing API ends after MAX_PAGES pages, so older posts of a single subreddit are unreachable
+        print(f"[Reddit] r/{subreddits[0]} has more new posts than one listing holds, older ones are skipped.")
+
+    by_subreddit = defaultdict(list)
+    for post in children:
+        key = post.get('subreddit', '').lower()
+        if key in since and post.get('created_utc', 0) > since[key]:
+            by_subreddit[key].append(post)
+
+    for subreddit, cursor in group_cursors.items():
+        posts = by_subreddit[subreddit.lower()]
+        newest = max(posts, key=lambda post: post.get('created_utc', 0), default=None)
+        if newest is None:
+            cursors.setCursor('reddit', cluster.shardKey(subreddit), None, full_sync=cursor is None)
+        else:
+            cursors.setCursor('reddit', cluster.shardKey(subreddit), newest.get('name'), full_sync=cursor is None,
+                              created_utc=newest.get('created_utc', 0))
 
-        response.raise_for_status()
-        data = response.json()
-
-        posts = []
-        now_utc = datetime.now(timezone.utc).timestamp()
-        three_days_ago = now_utc - 3 * 86400
-
-        for item in data.get('data', {}).get('children', []):
-            post = item.get('data', {})
-            if post.get('created_utc', 0) < three_days_ago:
-                continue
-
-            author = post.get('author')
-            if author and author != '[deleted]':
-                time.sleep(0.5)
-                post['author_created_utc'] = get_account_creation_utc(author)
-            else:
-                post['author_created_utc'] = None
-
-            posts.append(post)
-
-        posts_by_author = defaultdict(list)
-        for post in posts:
-            posts_by_author[post['author']].append(post)
-
-        filtered = []
-        for post in posts:
-            post_id = post.get('id', '')
-            combined_text = (post.get('title', '') + ' ' + post.get('selftext', '')).lower()
-            
-            if not isRelevant(combined_text, config["BLOCKLIST"]):
-                continue
-            if not isZeroShotRelevant(combined_text, config["KEYWORDS"]):
-                continue
-            if isProbablyBot(post, posts_by_author):
-                continue
-            
-            filtered.append(post)
-
-        return filtered
+        # Resyncs keep the old weekly-top behaviour of scoring at most the top posts per subreddit
+        if cursor is None:
+            posts = sorted(posts, key=lambda post: post.get('score', 0), reverse=True)[:RESYNC_TOP_POSTS]
+        results[subreddit] = filterPosts(posts, config)
 
-    except Exception as e:
-        print(f"[Reddit] API error for r/{subreddit}: {e}")
-        return []
+    return results
 
 def fetchRedditPosts(coins, config):
-    subreddit_map = {}
+    subreddit_coins = defaultdict(list)
     for coin in coins:
         subreddit = known_subs.get(coin)
         if subreddit:
-            subreddit_map[coin] = subreddit
+            subreddit_coins[subreddit].append(coin)
     
-    if not subreddit_map:
+    if not subreddit_coins:
         print("[Reddit] No known subreddits found for these coins. Reddit collection will be skipped.")
 
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     hist_dir = os.path.join(base_dir, "logs/reddit_posts")
     os.makedirs(hist_dir, exist_ok=True)
 
-    for coin, subreddit in subreddit_map.items():
-        file_path = os.path.join(hist_dir, f"{coin.upper()}.csv")
-        if os.path.exists(file_path):
-            last_modified = datetime.fromtimestamp(os.path.getmtime(file_path), tz=timezone.utc)
-            if datetime.now(timezone.utc) - last_modified < timedelta(minutes=15):
-                print(f"[Reddit] Skipping {coin}, posts are already up to date.")
-                continue
+    # A subreddit shared by several coins (MakerDAO: DAI and MKR) is fetched if any of them is stale
+    stale = []
+    for subreddit, sub_coins in subreddit_coins.items():
+        fresh = True
+        for coin in sub_coins:
+            file_path = os.path.join(hist_dir, f"{coin.upper()}.csv")
+            if not os.path.exists(file_path) or \
+                    datetime.now(timezone.utc) - datetime.fromtimestamp(os.path.getmtime(file_path), tz=timezone.utc) >= timedelta(minutes=15):
+                fresh = False
+        if fresh:
+            print(f"[Reddit] Skipping {', '.join(sub_coins)}, posts are already up to date.")
+            metrics.incCounter('symbols_skipped_total', len(sub_coins), provider='reddit')
+            continue
+        stale.append(subreddit)
 
-        posts = fetchSubreddit(subreddit, config)
-        if posts is None:
+    for start in range(0, len(stale), MULTIREDDIT_SIZE):
+        group = stale[start:start + MULTIREDDIT_SIZE]
+        results = fetchMultireddit(group, config)
+        if results is None:
             continue
 
-        log(coin, posts)
-        time.sleep(10)
\ No newline at end of file
+        for subreddit, posts in results.items():
+            for coin in subreddit_coins[subreddit]:
+                log(coin, posts)
+
+        if start + MULTIREDDIT_SIZE < len(stale):
+            time.sleep(REQUEST_DELAY)
+
+    relevanceCascade.logStats()
@@ -0,0 +1,155 @@
+import os
+import glob
+import gzip
+import json
+import hashlib
+import tempfile
+import threading
+from . import storage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# /dev/shm keeps the cache in memory and shared by every server worker on the host
+CACHE_DIR = os.environ.get("CRYPTOLOGGER_CACHE_DIR") or os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "cryptologger-cache")
+MAX_CACHE_BYTES = int(os.environ.get("CRYPTOLOGGER_CACHE_MAX_MB", "256")) * 1024 * 1024
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def sourceSignature(paths):
+    # A cached body is valid while every source file keeps its size and mtime
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append([path, stat.st_mtime_ns, stat.st_size])
+        except FileNotFoundError:
+            signature.append([path, None, None])
+    return signature
+
+def entryPaths(key):
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    base = os.path.join(CACHE_DIR, digest)
+    return base + ".meta.json", {'identity': base + ".json", 'gzip': base + ".json.gz", 'br': base + ".json.br"}
+
+def readEntry(key, signature, encoding):
+    meta_path, bodies = entryPaths(key)
+    meta = storage.readJson(meta_path, {})
+    if meta.get('signature') != signature or encoding not in meta.get('encodings', []):
+        return None
+    try:
+        with open(bodies[encoding], 'rb') as f:
+            body = f.read()
+        os.utime(meta_path)  # The metadata mtime is the entry's last use for LRU eviction
+        return body
+    except FileNotFoundError:
+        return None
+
+def evict():
+    # Drop least recently used entries until the cache fits MAX_CACHE_BYTES again. Temp files and
+    # entries whose metadata is not written yet belong to a writer that is still running, so they are left alone
+    entries = {}
+    for path in glob.glob(os.path.join(CACHE_DIR, "*")):
+        if path.endswith('.tmp'):
+            continue
+        digest = os.path.basename(path).split('.')[0]
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entry = entries.setdefault(digest, {'size': 0, 'used': None, 'paths': []})
+        entry['size'] += stat.st_size
+        entry['paths'].append(path)
+        if path.endswith('.meta.json'):
+            entry['used'] = stat.st_mtime
+
+    total = sum(entry['size'] for entry in entries.values())
+    complete = [entry for entry in entries.values() if entry['used'] is not None]
+    for entry in sorted(complete, key=lambda entry: entry['used']):
+        if total <= MAX_CACHE_BYTES:
+            break
+        for path in entry['paths']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total -= entry['size']
+
+def writeEntry(key, signature, body):
+    # Bodies first, metadata last, so a reader never pairs a new signature with an old body
+    meta_path, bodies = entryPaths(key)
+    encoded = {'identity': body}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        encoded['gzip'] = gzip.compress(body, GZIP_LEVEL)
+        if brotli is not None:
+            encoded['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    for encoding, data in encoded.items():
+        tmp_path = f"{bodies[encoding]}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, bodies[encoding])
+    storage.writeJson(meta_path, {'key': key, 'signature': signature, 'encodings': list(encoded)})
+    evict()
+    return encoded
+
+def chooseEncoding(accept_encoding):
+    # Highest q wins, br before gzip on ties; q=0 refuses an encoding, * covers the unlisted ones
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            field, _, value = param.partition('=')
+            if field.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    scored = [(weights.get(encoding, weights.get('*', 0.0)), -i, encoding) for i, encoding in enumerate(candidates)]
+    best = max(scored)
+    return best[2] if best[0] > 0 else 'identity'
+
+def getResponse(key, sources, build, accept_encoding=None):
+    """
+    Return (body, content_encoding) for a JSON response, built at most once per
+    change of its source files and shared by every worker process.
+    """
+    signature = sourceSignature(sources)
+    encoding = chooseEncoding(accept_encoding)
+
+    body = readEntry(key, signature, encoding)
+    if body is None and encoding != 'identity':
+        # Small bodies are stored uncompressed only
+        body = readEntry(key, signature, 'identity')
+        if body is not None:
+            return body, 'identity'
+    if body is not None:
+        return body, encoding
+
+    # One thread or worker builds a cold key; the others wait for it and read its entry
+    meta_path, _ = entryPaths(key)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with storage.lockFile(meta_path):
+        for candidate in dict.fromkeys([encoding, 'identity']):
+            body = readEntry(key, signature, candidate)
+            if body is not None:
+                return body, candidate
+
+        # Sorted keys like Flask's jsonify, so cached and uncached responses look the same
+        body = json.dumps(build(), separators=(',', ':'), sort_keys=True, default=str).encode('utf-8')
+        encoded = writeEntry(key, signature, body)
+    if encoding in encoded:
+        return encoded[encoding], encoding
+    return encoded['identity'], 'identity'
@@ -0,0 +1,147 @@
+import csv
+import io
+import os
+import json
+import zlib
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+MANIFEST_FILE = "manifest.json"
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+def readJson(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+def writeJson(path, data):
+    # Write to a temp file and swap it in so readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+@contextmanager
+def lockFile(path):
+    # Serializes writers across threads and, where fcntl exists, across processes
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(path, threading.Lock())
+
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", 'a') as lock_handle:
+            fcntl.flock(lock_handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_handle, fcntl.LOCK_UN)
+
+def updateJson(path, mutate, default=None):
+    with lockFile(path):
+        data = readJson(path, default if default is not None else {})
+        data = mutate(data)
+        writeJson(path, data)
+        return data
+
+def writeCsv(path, fieldnames, rows):
+    buffer = io.StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+    content = buffer.getvalue().encode('utf-8')
+
+    # Same temp file swap as writeJson, so readers and crashes never leave a truncated CSV behind
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+    return format(zlib.crc32(content), '08x')
+
+def readLastRow(path, chunk_size=1024):
+    # Seek from the end of the file instead of parsing every row
+    try:
+        with open(path, 'rb') as f:
+            header = f.readline()
+            header_end = f.tell()
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            tail = b''
+
+            while position > header_end:
+                read_size = min(chunk_size, position - header_end)
+                position -= read_size
+                f.seek(position)
+                tail = f.read(read_size) + tail
+                if tail.rstrip(b'\r\n').count(b'\n') >= 1:
+                    break
+    except FileNotFoundError:
+        return None
+
+    lines = tail.rstrip(b'\r\n').splitlines()
+    if not header or not lines or not lines[-1]:
+        return None
+
+    fieldnames = next(csv.reader([header.decode('utf-8').rstrip('\r\n')]))
+    values = next(csv.reader([lines[-1].decode('utf-8')]))
+    return dict(zip(fieldnames, values))
+
+def loadManifest(directory):
+    return readJson(os.path.join(directory, MANIFEST_FILE), {})
+
+def updateManifest(directory, symbol, last_date, row_count, checksum):
+    # The file's size and mtime let readers check the entry with a stat instead of re-reading the file
+    stat = os.stat(os.path.join(directory, f"{symbol}.csv"))
+
+    def mutate(manifest):
+        manifest[symbol] = {'last_date': last_date, 'rows': row_count, 'checksum': checksum,
+                            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        return manifest
+
+    updateJson(os.path.join(directory, MANIFEST_FILE), mutate)
+
+def manifestEntry(directory, symbol, manifest):
+    # None unless the CSV still exists and is the file the entry was recorded for; a crash between
+    # the CSV write and the manifest update, or an edit by hand, makes the entry stale
+    entry = manifest.get(symbol)
+    if not entry:
+        return None
+    try:
+        stat = os.stat(os.path.join(directory, f"{symbol}.csv"))
+    except FileNotFoundError:
+        return None
+    if stat.st_size != entry.get('size') or stat.st_mtime_ns != entry.get('mtime_ns'):
+        return None
+    return entry
+
+def getChecksum(directory, symbol, manifest):
+    entry = manifestEntry(directory, symbol, manifest)
+    if entry:
+        return entry['checksum']
+    try:
+        with open(os.path.join(directory, f"{symbol}.csv"), 'rb') as f:
+            return format(zlib.crc32(f.read()), '08x')
+    except FileNotFoundError:
+        return None
+
+def getLastDate(directory, symbol, manifest=None):
+    if manifest is None:
+        manifest = loadManifest(directory)
+
+    entry = manifestEntry(directory, symbol, manifest)
+    if entry and entry.get('last_date'):
+        return entry['last_date']
+
+    last_row = readLastRow(os.path.join(directory, f"{symbol}.csv"))
+    return last_row.get('date') if last_row else None
@@ -0,0 +1,41 @@
+import threading
+from . import metrics
+
+_lock = threading.Lock()
+_state = {'coins': {}}
+_subscribers = []
+
+def currentSymbols():
+    with _lock:
+        return [coin['symbol'] for coin in _state['coins'].values()]
+
+def subscribe(callback):
+    # callback(added, removed) runs after every update that changed the top coins;
+    # both are lists of {'id', 'symbol', 'name'} records, added ones in market cap order
+    _subscribers.append(callback)
+
+def update(symbols, names, ids):
+    """
+    Diff the current top coins against the previous tick, keyed by CoinGecko id, and notify subscribers.
+    The first call reports every coin as added.
+    """
+    current = {coin_id: {'id': coin_id, 'symbol': symbol, 'name': name} for symbol, name, coin_id in zip(symbols, names, ids)}
+
+    with _lock:
+        previous = _state['coins']
+        added_ids = current.keys() - previous.keys()
+        removed_ids = previous.keys() - current.keys()
+        _state['coins'] = current
+
+    added = [coin for coin_id, coin in current.items() if coin_id in added_ids]
+    removed = [coin for coin_id, coin in previous.items() if coin_id in removed_ids]
+    metrics.incCounter('top_coin_changes_total', len(added), change='added')
+    metrics.incCounter('top_coin_changes_total', len(removed), change='removed')
+
+    if added or removed:
+        for callback in list(_subscribers):
+            try:
+                callback(added, removed)
+            except Exception as e:
+                print(f"[TopCoins] Subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+    return added, removed
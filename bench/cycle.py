@@ -0,0 +1,104 @@
+import sys
+import json
+import time
+import argparse
+import subprocess
+from . import sandbox
+from . import replayServer
+
+RESULT_MARKER = "BENCH_RESULT "
+DEFAULT_COIN_COUNTS = [50, 200, 1000]
+
+def runCycle(num_coins):
+    # Runs inside the sandbox: one live tick, one media cycle and one history sync
+    import collector
+    from API import configWatcher
+    from API import news
+    from API import reddit
+    from API import historySync
+    from API.analysis import weightedSentiment
+
+    config = configWatcher.getConfig()
+
+    currency = config["currency"]
+    days = config["historical-data-days"]
+    timings = {}
+
+    start = time.perf_counter()
+    coins, names, ids = collector.getTopCoins(num_coins, num_coins + config["selection-margin"], currency, config)
+    timings['live_tick'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    news.fetchCryptoNews(coins, names)
+    reddit.fetchRedditPosts(coins, config)
+    weightedSentiment.computeWeightedSentiment(coins)
+    timings['media_cycle'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    historySync.syncHistoricalData(coins, ids, currency, days)
+    timings['daily_history'] = time.perf_counter() - start
+
+    timings['coins'] = len(coins)
+    return timings
+
+def runWorker(args):
+    sandbox.redirectRequests(args.replay_url)
+    if args.skip_sleep:
+        sandbox.skipSleeps()
+
+    timings = runCycle(args.coins)
+    timings['sleep_skipped'] = sandbox.sleep_requested
+    print(RESULT_MARKER + json.dumps(timings))
+
+def benchmark(coin_counts, latency_ms, rate_429, skip_sleep):
+    server, replay_url = replayServer.startServer(latency_ms=latency_ms, rate_429=rate_429)
+    results = []
+
+    try:
+        for num_coins in coin_counts:
+            sandbox_dir = sandbox.createSandbox({'top-number-of-coins': num_coins})
+            command = [sys.executable, '-m', 'bench.cycle', '--worker', '--coins', str(num_coins), '--replay-url', replay_url]
+            if skip_sleep:
+                command.append('--skip-sleep')
+
+            try:
+                completed = subprocess.run(command, cwd=sandbox_dir, capture_output=True, text=True)
+            finally:
+                sandbox.removeSandbox(sandbox_dir)
+
+            lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+            if completed.returncode != 0 or not lines:
+                print(f"[Bench] Cycle failed for {num_coins} coins:\n{completed.stderr[-2000:]}")
+                continue
+
+            result = json.loads(lines[-1][len(RESULT_MARKER):])
+            result['requested_coins'] = num_coins
+            results.append(result)
+            print(f"[Bench] {num_coins:>5} coins | live tick {result['live_tick']:8.2f}s | "
+                  f"media cycle {result['media_cycle']:8.2f}s | daily history {result['daily_history']:8.2f}s | "
+                  f"sleeps skipped {result['sleep_skipped']:8.1f}s")
+    finally:
+        server.shutdown()
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time one full collector cycle against the replay server")
+    parser.add_argument('--coins', type=int, nargs='+', default=DEFAULT_COIN_COUNTS)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--keep-sleeps', action='store_true', help="Actually sleep on rate-limit delays")
+    parser.add_argument('--output', help="Write results as JSON to this path")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--replay-url', help=argparse.SUPPRESS)
+    parser.add_argument('--skip-sleep', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        args.coins = args.coins[0]
+        runWorker(args)
+    else:
+        results = benchmark(args.coins, args.latency_ms, args.rate_429, not args.keep_sleeps)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
@@ -0,0 +1,191 @@
+import os
+import re
+import json
+import time
+import random
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Only traffic to these hosts is recorded or replayed; model downloads go out untouched
+API_HOSTS = {
+    'api.coingecko.com',
+    'min-api.cryptocompare.com',
+    'newsapi.org',
+    'www.reddit.com',
+}
+
+def classify(host, path, params):
+    # Maps a request to (route, key); key picks the fixture within a route
+    if host == 'api.coingecko.com':
+        if path.endswith('/coins/markets'):
+            return 'coingecko_markets', 'ids' if params.get('ids') else 'top'
+        match = re.search(r'/coins/([^/]+)/market_chart$', path)
+        if match:
+            return 'coingecko_chart', match.group(1)
+    elif host == 'min-api.cryptocompare.com' and path.endswith('/histoday'):
+        return 'cryptocompare_histoday', params.get('fsym', '')
+    elif host == 'newsapi.org' and path.endswith('/everything'):
+        return 'newsapi', params.get('q', '')
+    elif host == 'www.reddit.com':
+        match = re.match(r'/r/([^/]+)/', path)
+        if match:
+            return 'reddit_listing', match.group(1)
+        match = re.match(r'/user/([^/]+)/about\.json$', path)
+        if match:
+            return 'reddit_user', match.group(1)
+    return None, None
+
+def splitUrl(url):
+    parts = urlsplit(url)
+    params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+    return parts.hostname, parts.path, params
+
+def fixturePath(route, key):
+    safe_key = re.sub(r'[^A-Za-z0-9_.+-]', '_', key)[:120] or '_'
+    return os.path.join(FIXTURES_DIR, route, f"{safe_key}.json")
+
+def saveFixture(route, key, status, body):
+    path = fixturePath(route, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fixture = {'route': route, 'key': key, 'status': status, 'body': body}
+
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f)
+
+    # The first fixture of a route doubles as the template for unrecorded keys
+    default_path = fixturePath(route, '_default')
+    if not os.path.exists(default_path):
+        with open(default_path, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f)
+
+def loadFixture(route, key):
+    for path in (fixturePath(route, key), fixturePath(route, '_default')):
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    return None
+
+def queryTerms(query):
+    return re.findall(r'"([^"]+)"', query) or [query]
+
+def adaptFixture(fixture, key):
+    # Reuse a template fixture for another key by swapping the recorded names
+    if fixture['key'] == key:
+        return fixture['body']
+
+    text = json.dumps(fixture['body'])
+    for old, new in zip(queryTerms(fixture['key']), queryTerms(key)):
+        if old and new:
+            text = text.replace(old, new)
+    return json.loads(text)
+
+def syntheticCoin(index):
+    price = 10.0 + index * 1.7
+    return {
+        'id': f"coin-{index}",
+        'symbol': f"c{index}",
+        'name': f"Coin {index}",
+        'current_price': price,
+        'market_cap': 1e12 / (index + 1),
+        'total_volume': 1e9 / (index + 1),
+        'high_24h': price * 1.03,
+        'low_24h': price * 0.97,
+        'price_change_24h': price * 0.01,
+        'price_change_percentage_24h': 1.0,
+        'market_cap_change_percentage_24h': 1.0,
+    }
+
+def extendMarkets(coins, count):
+    # Clone recorded coins with suffixed ids/symbols to reach the requested coin count
+    coins = list(coins) or [syntheticCoin(0)]
+    extended = list(coins[:count])
+    index = 0
+    while len(extended) < count:
+        template = coins[index % len(coins)]
+        suffix = index // len(coins) + 1
+        extended.append({
+            **template,
+            'id': f"{template['id']}-{suffix}",
+            'symbol': f"{template['symbol']}{suffix}",
+            'name': f"{template['name']} {suffix}",
+        })
+        index += 1
+    return extended
+
+def syntheticBody(route, key, params):
+    now = int(time.time())
+
+    if route == 'coingecko_markets':
+        if params.get('ids'):
+            return [{**syntheticCoin(i), 'id': coin_id} for i, coin_id in enumerate(params['ids'].split(','))]
+        return [syntheticCoin(i) for i in range(int(params.get('per_page', 100)))]
+
+    if route == 'coingecko_chart':
+        days = int(params.get('days', 30))
+        start = (now - days * 86400) * 1000
+        prices = [[start + i * 86400000, 100 + random.uniform(-5, 5)] for i in range(days + 1)]
+        volumes = [[ts, 1e9] for ts, _ in prices]
+        return {'prices': prices, 'market_caps': volumes, 'total_volumes': volumes}
+
+    if route == 'cryptocompare_histoday':
+        limit = int(params.get('limit', 30))
+        rows = []
+        for i in range(limit + 1):
+            price = 100 + random.uniform(-5, 5)
+            rows.append({
+                'time': now - (limit - i) * 86400,
+                'open': price, 'high': price * 1.02, 'low': price * 0.98, 'close': price,
+                'volumeto': 1e9,
+            })
+        return {'Response': 'Success', 'Data': {'Data': rows}}
+
+    if route == 'newsapi':
+        name = queryTerms(key)[0]
+        articles = []
+        for i in range(20):
+            articles.append({
+                'source': {'name': f"Source {i % 5}"},
+                'title': f"{name} price moves as traders react to market update {i}",
+                'description': f"{name} traded higher after a volatile session.",
+                'content': f"{name} rallied in early trading. Analysts said {name} demand remains strong. " * 3,
+                'url': f"https://news.example.com/{name.replace(' ', '-')}/{i}",
+                'publishedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now - i * 3600)),
+            })
+        return {'status': 'ok', 'totalResults': len(articles), 'articles': articles}
+
+    if route == 'reddit_listing':
+        children = []
+        for i in range(25):
+            children.append({'kind': 't3', 'data': {
+                'id': f"{key[:4]}{i}",
+                'name': f"t3_{key[:4]}{i}",
+                'subreddit': key.split('+')[i % len(key.split('+'))],
+                'title': f"Price analysis and market outlook thread {i}",
+                'selftext': "Looking at the chart, volume is up and the trend is improving.",
+                'score': 50 + i,
+                'upvote_ratio': 0.9,
+                'author': f"user{i % 10}",
+                'created_utc': now - i * 1800,
+            }})
+        return {'kind': 'Listing', 'data': {'children': children, 'after': None}}
+
+    if route == 'reddit_user':
+        return {'data': {'created_utc': now - 400 * 86400}}
+
+    return {}
+
+def resolveBody(route, key, params):
+    fixture = loadFixture(route, key)
+    if fixture is None:
+        return syntheticBody(route, key, params)
+
+    body = adaptFixture(fixture, key)
+    if route == 'coingecko_markets' and isinstance(body, list):
+        if params.get('ids'):
+            ids = params['ids'].split(',')
+            body = [{**coin, 'id': coin_id} for coin, coin_id in zip(extendMarkets(body, len(ids)), ids)]
+        else:
+            body = extendMarkets(body, int(params.get('per_page', len(body))))
+    return body
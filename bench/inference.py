@@ -0,0 +1,182 @@
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import statistics
+import subprocess
+from .sandbox import REPO_DIR
+
+RESULT_MARKER = "BENCH_RESULT "
+FINBERT_MODEL = "ProsusAI/finbert"
+ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+ZERO_SHOT_THRESHOLD = 0.4
+
+SAMPLE_TEXTS = [
+    "Bitcoin surges past $70,000 as ETF inflows hit a record high",
+    "Ethereum developers delay the next network upgrade after testnet issues",
+    "Solana suffers another outage, validators coordinate a restart",
+    "XRP jumps 12% after a favourable court ruling for Ripple",
+    "Cardano founder outlines roadmap for the coming year",
+    "Dogecoin slides as meme coin enthusiasm fades",
+    "Crypto exchange reports $200 million hack, withdrawals paused",
+    "Analysts expect volatility ahead of the Federal Reserve meeting",
+    "Chainlink partners with a major bank to bring price feeds on-chain",
+    "Litecoin hashrate reaches an all-time high ahead of halving",
+    "Polkadot parachain auctions draw weaker demand than expected",
+    "Avalanche network fees drop after the latest upgrade",
+    "Regulators sue a token issuer for selling unregistered securities",
+    "Stablecoin market cap climbs to a new record",
+    "Traders liquidated as Bitcoin drops 8% in an hour",
+    "Monero delisted from another exchange over compliance concerns",
+    "Uniswap volume outpaces centralized exchanges for the second month",
+    "Institutional investors increase exposure to digital assets, survey finds",
+    "Mining company reports quarterly loss as energy costs rise",
+    "Lost my keys lol, anyone else do this? pretty funny honestly",
+    "Just bought my first ETH, what wallet should I use?",
+    "Price analysis: BTC forms a bullish flag on the daily chart",
+    "Is this the bottom? Market sentiment at extreme fear",
+    "Staking rewards cut in half after protocol vote",
+    "Shiba Inu burn rate spikes 400% overnight",
+]
+
+def loadLogTexts(limit):
+    texts = []
+    for folder in ['news_articles', 'reddit_posts']:
+        for path in glob.glob(os.path.join(REPO_DIR, 'logs', folder, '*.csv')):
+            with open(path, newline='', encoding='utf-8') as f:
+                texts.extend(row['title'] for row in csv.DictReader(f) if row.get('title'))
+            if len(texts) >= limit:
+                return texts[:limit]
+    return texts
+
+def rssMegabytes():
+    # Current and peak resident set size of this process
+    try:
+        with open('/proc/self/status') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(fields['VmRSS'].split()[0]) / 1024, int(fields['VmHWM'].split()[0]) / 1024
+    except (OSError, KeyError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return peak, peak
+
+def latencySummary(samples):
+    ordered = sorted(samples)
+    return {
+        'median_ms': statistics.median(ordered) * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+def runWorker(backend, texts, keywords):
+    from API.analysis import inference
+
+    start = time.perf_counter()
+    # Strict, so a missing optimum fails the backend instead of comparing torch against itself
+    finbert = inference.loadPipeline("sentiment-analysis", FINBERT_MODEL, backend, strict=True)
+    classifier = inference.loadPipeline("zero-shot-classification", ZERO_SHOT_MODEL, backend, strict=True)
+    load_seconds = time.perf_counter() - start
+    rss_loaded, _ = rssMegabytes()
+
+    finbert_outputs, finbert_latency = [], []
+    for text in texts:
+        start = time.perf_counter()
+        result = finbert(text[:512])[0]
+        finbert_latency.append(time.perf_counter() - start)
+        finbert_outputs.append([result['label'], result['score']])
+
+    zero_shot_outputs, zero_shot_latency = [], []
+    for text in texts:
+        start = time.perf_counter()
+        result = classifier(text, candidate_labels=keywords, multi_label=False)
+        zero_shot_latency.append(time.perf_counter() - start)
+        zero_shot_outputs.append([result['labels'][0], result['scores'][0]])
+
+    _, rss_peak = rssMegabytes()
+    print(RESULT_MARKER + json.dumps({
+        'backend': backend,
+        'load_seconds': load_seconds,
+        'rss_loaded_mb': rss_loaded,
+        'rss_peak_mb': rss_peak,
+        'finbert': {**latencySummary(finbert_latency), 'outputs': finbert_outputs},
+        'zero_shot': {**latencySummary(zero_shot_latency), 'outputs': zero_shot_outputs},
+    }))
+
+def signedScore(output):
+    label, score = output
+    return score if label == 'positive' else -score if label == 'negative' else 0.0
+
+def parity(reference, candidate):
+    pairs = list(zip(reference['finbert']['outputs'], candidate['finbert']['outputs']))
+    zero_shot_pairs = list(zip(reference['zero_shot']['outputs'], candidate['zero_shot']['outputs']))
+    return {
+        'finbert_label_agreement': sum(a[0] == b[0] for a, b in pairs) / len(pairs),
+        'finbert_score_mae': sum(abs(signedScore(a) - signedScore(b)) for a, b in pairs) / len(pairs),
+        'zero_shot_decision_agreement': sum(
+            (a[1] >= ZERO_SHOT_THRESHOLD) == (b[1] >= ZERO_SHOT_THRESHOLD) and a[0] == b[0] for a, b in zero_shot_pairs
+        ) / len(zero_shot_pairs),
+        'zero_shot_score_mae': sum(abs(a[1] - b[1]) for a, b in zero_shot_pairs) / len(zero_shot_pairs),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency, memory and accuracy parity of the inference backends")
+    parser.add_argument('--backends', nargs='+', default=['torch', 'torch-int8', 'onnx', 'onnx-int8'])
+    parser.add_argument('--from-logs', type=int, default=0, help="Add up to N titles from logs/ to the corpus")
+    parser.add_argument('--min-agreement', type=float, default=0.95)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--backend', help=argparse.SUPPRESS)
+    parser.add_argument('--corpus', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_DIR, 'config.json')) as f:
+        keywords = json.load(f)["KEYWORDS"]
+
+    if args.worker:
+        with open(args.corpus) as f:
+            runWorker(args.backend, json.load(f), keywords)
+        sys.exit(0)
+
+    # The corpus lives outside the repo so a benchmark run never leaves files in the real logs/;
+    # the workers still run from the repo to share its exported model cache
+    corpus_dir = tempfile.mkdtemp(prefix="cryptologger-bench-")
+    corpus_path = os.path.join(corpus_dir, 'inference_corpus.json')
+    with open(corpus_path, 'w') as f:
+        json.dump(SAMPLE_TEXTS + loadLogTexts(args.from_logs), f)
+
+    # The torch backend is the reference every other backend is compared against
+    backends = ['torch'] + [backend for backend in args.backends if backend != 'torch']
+    results = {}
+    failed = False
+    try:
+        for backend in backends:
+            completed = subprocess.run([sys.executable, '-m', 'bench.inference', '--worker', '--backend', backend,
+                                        '--corpus', corpus_path], cwd=REPO_DIR, capture_output=True, text=True)
+            lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+            if completed.returncode != 0 or not lines:
+                print(f"[Bench] Backend {backend} failed:\n{completed.stderr[-2000:]}")
+                failed = True
+                continue
+            results[backend] = json.loads(lines[-1][len(RESULT_MARKER):])
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    if 'torch' not in results:
+        sys.exit(1)
+
+    for backend, result in results.items():
+        scores = parity(results['torch'], result)
+        print(f"[Bench] {backend:<10} | load {result['load_seconds']:6.1f}s | RSS {result['rss_loaded_mb']:7.0f} MB "
+              f"(peak {result['rss_peak_mb']:7.0f}) | FinBERT {result['finbert']['median_ms']:6.1f} ms "
+              f"(p95 {result['finbert']['p95_ms']:6.1f}) | zero-shot {result['zero_shot']['median_ms']:7.1f} ms "
+              f"(p95 {result['zero_shot']['p95_ms']:7.1f})")
+        print(f"           | FinBERT label agreement {scores['finbert_label_agreement']:.1%}, score MAE {scores['finbert_score_mae']:.3f} "
+              f"| zero-shot decision agreement {scores['zero_shot_decision_agreement']:.1%}, score MAE {scores['zero_shot_score_mae']:.3f}")
+        if min(scores['finbert_label_agreement'], scores['zero_shot_decision_agreement']) < args.min_agreement:
+            print(f"[Bench] {backend} is below the {args.min_agreement:.0%} agreement threshold")
+            failed = True
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import requests
+from collections import defaultdict
+from .sandbox import REPO_DIR
+
+DEFAULT_ENDPOINTS = ['/api/latest', '/api/live', '/api/live_sentiment', '/api/history', '/api/bars/BTC/5m']
+
+def freePort():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def startServer(mode, workers):
+    # gunicorn runs the production entry point, dev the threaded Flask server as one process
+    port = freePort()
+    if mode == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(workers), '--access-logfile', '', 'wsgi:app']
+    else:
+        command = [sys.executable, '-c', f"import server; server.app.run(port={port}, threaded=True)"]
+
+    process = subprocess.Popen(command, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{mode} server exited:\n{process.stderr.read().decode()[-2000:]}")
+        try:
+            requests.get(url + '/api/files', timeout=1)
+            return process, url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{mode} server did not start within 60 seconds")
+
+def worker(url, endpoints, offset, stop_at, latencies, errors, compressed):
+    session = requests.Session()
+    headers = {'Accept-Encoding': 'br, gzip' if compressed else 'identity'}
+    i = offset
+    while time.perf_counter() < stop_at:
+        endpoint = endpoints[i % len(endpoints)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = session.get(url + endpoint, headers=headers, timeout=30)
+            response.content
+            if response.status_code != 200:
+                errors[endpoint] += 1
+                continue
+        except requests.exceptions.RequestException:
+            errors[endpoint] += 1
+            continue
+        latencies[endpoint].append(time.perf_counter() - start)
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else float('nan')
+
+def run(url, endpoints, concurrency, duration, compressed):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    stop_at = time.perf_counter() + duration
+    threads = [threading.Thread(target=worker, args=(url, endpoints, i, stop_at, latencies, errors, compressed))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    all_samples = [sample for samples in latencies.values() for sample in samples]
+    print(f"[Bench] {url} | {concurrency} clients | {duration}s | {'compressed' if compressed else 'identity'}")
+    for endpoint in endpoints:
+        samples = latencies[endpoint]
+        print(f"[Bench] {endpoint:<22} | {len(samples) / duration:8.1f} req/s | p50 {percentile(samples, 0.5) * 1000:8.1f} ms "
+              f"| p99 {percentile(samples, 0.99) * 1000:8.1f} ms | errors {errors[endpoint]}")
+    print(f"[Bench] {'total':<22} | {len(all_samples) / duration:8.1f} req/s | p50 {percentile(all_samples, 0.5) * 1000:8.1f} ms "
+          f"| p99 {percentile(all_samples, 0.99) * 1000:8.1f} ms | errors {sum(errors.values())}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the API server against the local logs/ data")
+    parser.add_argument('--url', help="Test an already running server instead of starting one")
+    parser.add_argument('--server', choices=['gunicorn', 'dev'], nargs='+', default=['gunicorn'])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--endpoints', nargs='+', default=DEFAULT_ENDPOINTS)
+    parser.add_argument('--no-compression', action='store_true', help="Send Accept-Encoding: identity")
+    args = parser.parse_args()
+
+    if args.url:
+        run(args.url.rstrip('/'), args.endpoints, args.concurrency, args.duration, not args.no_compression)
+        sys.exit(0)
+
+    for mode in args.server:
+        process, url = startServer(mode, args.workers)
+        try:
+            run(url, args.endpoints, args.concurrency, args.duration, not args.no_compression)
+        finally:
+            process.terminate()
+            process.wait()
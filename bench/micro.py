@@ -0,0 +1,223 @@
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import statistics
+import subprocess
+from datetime import datetime, timezone, timedelta
+from . import sandbox
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "micro.json")
+RESULT_MARKER = "BENCH_RESULT "
+REGRESSION_THRESHOLD = 1.10
+
+COIN_SWEEP = [10, 50, 200]
+LIVE_ROWS_PER_COIN = 1440  # 24h of minute ticks
+HISTORY_ROW_SWEEP = [30, 90, 365]
+ARTICLE_SWEEP = [100, 1000]
+SENTIMENT_ROW_SWEEP = [50, 500]
+
+def timeCall(function, repeat, setup=None):
+    # setup runs untimed before every repeat, for cases whose call changes their own fixture
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return {'min': min(samples), 'median': statistics.median(samples)}
+
+def syntheticCoins(count):
+    return [{
+        'id': f"coin-{i}",
+        'symbol': f"c{i}",
+        'name': f"Coin {i}",
+        'current_price': 100.0 + i,
+        'market_cap': 1e9,
+        'total_volume': 1e8,
+        'price_change_percentage_24h': 0.5,
+        'market_cap_change_percentage_24h': 0.5,
+    } for i in range(count)]
+
+def writeLiveData(coins):
+    os.makedirs(os.path.join("logs", "live_data"), exist_ok=True)
+    now = datetime.now(timezone.utc)
+    with open(os.path.join("logs", "live_data", "live_data.csv"), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['timestamp', 'symbol', 'price', 'market_cap', 'total_volume',
+                         'price_change_pct_24h', 'market_cap_change_pct_24h', 'outlier_daily'])
+        for minute in range(LIVE_ROWS_PER_COIN, 0, -1):
+            timestamp = (now - timedelta(minutes=minute)).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            for coin in coins:
+                price = coin['current_price'] * random.uniform(0.98, 1.02)
+                writer.writerow([timestamp, coin['symbol'].upper(), price, 1e9, 1e8, 0.5, 0.5, 'f'])
+
+def writeMergedHistory(symbols, rows):
+    os.makedirs(os.path.join("logs", "hist_merged"), exist_ok=True)
+    today = datetime.now(timezone.utc).date()
+    with open(os.path.join("logs", "hist_merged", "ohlcv.csv"), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['symbol', 'date', 'open', 'high', 'low', 'close', 'volume', 'source'])
+        for symbol in symbols:
+            for day in range(rows, 0, -1):
+                price = 100 * random.uniform(0.9, 1.1)
+                writer.writerow([symbol, (today - timedelta(days=day)).isoformat(), price, price * 1.02,
+                                 price * 0.98, price, 1e8, 'cryptocompare'])
+
+def writeSentimentFiles(symbols, rows):
+    now = datetime.now(timezone.utc)
+    for folder, fieldnames in [('news_articles', ['title', 'source_name', 'url', 'published_at', 'sentiment_score']),
+                               ('reddit_posts', ['post_id', 'subreddit', 'title', 'score', 'created_utc', 'sentiment_score'])]:
+        os.makedirs(os.path.join("logs", folder), exist_ok=True)
+        for symbol in symbols:
+            with open(os.path.join("logs", folder, f"{symbol}.csv"), 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+                writer.writeheader()
+                for i in range(rows):
+                    created = (now - timedelta(minutes=10 * i)).isoformat(sep=' ')
+                    writer.writerow({
+                        'title': f"{symbol} headline {i}", 'source_name': 'Source', 'url': f"https://x/{symbol}/{i}",
+                        'published_at': created, 'post_id': f"{symbol}{i}", 'subreddit': symbol, 'score': i,
+                        'created_utc': created, 'sentiment_score': random.uniform(-1, 1),
+                    })
+
+def syntheticArticles(count, coin_names):
+    articles = []
+    for i in range(count):
+        name = coin_names[i % len(coin_names)]
+        other = coin_names[(i + 1) % len(coin_names)]
+        articles.append({
+            'title': f"{name} climbs while {other} holds steady in crypto market",
+            'description': f"{name} outpaced the broader cryptocurrency market today.",
+            'content': f"{name} rose 4% as traders rotated out of {other}. " * 5,
+        })
+    return articles
+
+def benchCoingeckoLog(repeat):
+    from API import coingecko
+    from API.analysis import streamingOutlier
+    results = {}
+    for num_coins in COIN_SWEEP:
+        coins = syntheticCoins(num_coins)
+        writeMergedHistory([coin['symbol'].upper() for coin in coins], 90)
+
+        # Every call appends a tick per coin and warms the outlier windows, so each repeat starts
+        # from the same live_data.csv and cold windows instead of a file that grows across repeats
+        def reset():
+            writeLiveData(coins)
+            streamingOutlier.reset()
+
+        results[f"coingecko.log[coins={num_coins},rows={num_coins * LIVE_ROWS_PER_COIN}]"] = \
+            timeCall(lambda: coingecko.log(coins), repeat, setup=reset)
+    return results
+
+def benchPriceOutlier(repeat):
+    from API.analysis import priceOutlier
+    results = {}
+    for num_coins in COIN_SWEEP:
+        symbols = [f"C{i}" for i in range(num_coins)]
+        for rows in HISTORY_ROW_SWEEP:
+            writeMergedHistory(symbols, rows)
+            run = lambda: [priceOutlier.isPriceOutlier(symbol, 100.0) for symbol in symbols]
+            run()  # Parse the dataset once so the sweep times the per-tick path
+            results[f"priceOutlier.isPriceOutlier[coins={num_coins},rows={rows}]"] = timeCall(run, repeat)
+    return results
+
+def benchRelevantArticle(repeat):
+    from API import news
+    results = {}
+    for num_coins in COIN_SWEEP:
+        names = [f"Coin{i}" for i in range(num_coins)]
+        symbols = [f"C{i}" for i in range(num_coins)]
+        others = symbols[1:] + names[1:]
+        for count in ARTICLE_SWEEP:
+            articles = syntheticArticles(count, names)
+            run = lambda: [news.isRelevantArticle(article, names[0], symbols[0], others) for article in articles]
+            results[f"news.isRelevantArticle[coins={num_coins},articles={count}]"] = timeCall(run, repeat)
+    return results
+
+def benchWeightedSentiment(repeat):
+    from API.analysis import weightedSentiment
+    results = {}
+    for num_coins in COIN_SWEEP:
+        symbols = [f"C{i}" for i in range(num_coins)]
+        for rows in SENTIMENT_ROW_SWEEP:
+            writeSentimentFiles(symbols, rows)
+            run = lambda: weightedSentiment.computeWeightedSentiment(symbols)
+            results[f"weightedSentiment.computeWeightedSentiment[coins={num_coins},rows={rows}]"] = timeCall(run, repeat)
+    return results
+
+BENCHMARKS = {
+    'coingecko_log': benchCoingeckoLog,
+    'price_outlier': benchPriceOutlier,
+    'relevant_article': benchRelevantArticle,
+    'weighted_sentiment': benchWeightedSentiment,
+}
+
+def runWorker(names, repeat):
+    # Module prints would drown the results, so they go to stderr while timing
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    random.seed(0)
+    results = {}
+    for name in names:
+        results.update(BENCHMARKS[name](repeat))
+    sys.stdout = stdout
+    print(RESULT_MARKER + json.dumps(results))
+
+def compare(results, baseline):
+    regressions = 0
+    for case, timing in results.items():
+        base = baseline.get(case)
+        if base is None:
+            print(f"{case:<75} {timing['median'] * 1000:10.2f} ms   (no baseline)")
+            continue
+        ratio = timing['median'] / base['median'] if base['median'] else float('inf')
+        marker = "  REGRESSION" if ratio > REGRESSION_THRESHOLD else ""
+        regressions += bool(marker)
+        print(f"{case:<75} {timing['median'] * 1000:10.2f} ms   x{ratio:5.2f} vs baseline{marker}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the per-minute hot path")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save-baseline', action='store_true', help="Store these timings as the new baseline")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        runWorker(args.only, args.repeat)
+        sys.exit(0)
+
+    sandbox_dir = sandbox.createSandbox()
+    try:
+        completed = subprocess.run([sys.executable, '-m', 'bench.micro', '--worker', '--repeat', str(args.repeat),
+                                    '--only', *args.only], cwd=sandbox_dir, capture_output=True, text=True)
+    finally:
+        sandbox.removeSandbox(sandbox_dir)
+
+    lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+    if completed.returncode != 0 or not lines:
+        print(f"[Bench] Microbenchmarks failed:\n{completed.stderr[-2000:]}")
+        sys.exit(1)
+
+    results = json.loads(lines[-1][len(RESULT_MARKER):])
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    regressions = compare(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+        print(f"[Bench] Baseline saved to {BASELINE_PATH}")
+    elif regressions:
+        sys.exit(1)
@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+from .sandbox import REPO_DIR
+from .inference import FINBERT_MODEL, ZERO_SHOT_MODEL, SAMPLE_TEXTS
+
+READY_MARKER = "WORKER_READY"
+
+def memoryMegabytes(pid):
+    # smaps_rollup sums every mapping of the process; plain smaps is the fallback on kernels before 4.14
+    fields = {}
+    path = f"/proc/{pid}/smaps_rollup"
+    if not os.path.exists(path):
+        path = f"/proc/{pid}/smaps"
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = fields.get(parts[0].rstrip(':'), 0) + int(parts[1])
+
+    return {
+        'rss': fields.get('Rss', 0) / 1024,
+        'pss': fields.get('Pss', 0) / 1024,
+        'shared': (fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)) / 1024,
+        'uss': (fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024,
+    }
+
+def loadModels(backend):
+    from API.analysis import inference
+    finbert = inference.loadPipeline("sentiment-analysis", FINBERT_MODEL, backend)
+    classifier = inference.loadPipeline("zero-shot-classification", ZERO_SHOT_MODEL, backend)
+    return finbert, classifier
+
+def warmUp(finbert, classifier, keywords):
+    # Run inference like a collector would, so the numbers include whatever the forward pass touches
+    for text in SAMPLE_TEXTS:
+        finbert(text[:512])
+        classifier(text, candidate_labels=keywords, multi_label=False)
+
+def waitForever():
+    while True:
+        time.sleep(3600)
+
+def runIndependent(num_workers, backend):
+    # Every worker is a fresh interpreter that loads its own copy of both models
+    processes = []
+    for _ in range(num_workers):
+        processes.append(subprocess.Popen([sys.executable, '-m', 'bench.prefork', '--worker', '--backend', backend],
+                                          cwd=REPO_DIR, stdout=subprocess.PIPE, text=True))
+    try:
+        for process in processes:
+            for line in process.stdout:
+                if line.strip() == READY_MARKER:
+                    break
+            else:
+                raise RuntimeError(f"Worker {process.pid} exited before it was ready")
+        return {'parent': None, 'workers': [memoryMegabytes(process.pid) for process in processes]}
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+def runPrefork(num_workers, backend, keywords):
+    from API import prefork
+
+    # Same path as `collector.py --workers`: load in the parent, freeze, fork
+    finbert, classifier = loadModels(backend)
+    prefork.prepareFork()
+
+    pids, ready = [], []
+    for index in range(num_workers):
+        read_fd, write_fd = os.pipe()
+
+        def target(index, write_fd=write_fd, read_fd=read_fd):
+            os.close(read_fd)
+            warmUp(finbert, classifier, keywords)
+            os.write(write_fd, b'1')
+            waitForever()
+
+        pids.append(prefork.forkWorker(index, num_workers, target))
+        os.close(write_fd)
+        ready.append(read_fd)
+
+    try:
+        for pid, read_fd in zip(pids, ready):
+            if os.read(read_fd, 1) != b'1':
+                raise RuntimeError(f"Worker {pid} exited before it was ready")
+            os.close(read_fd)
+        return {'parent': memoryMegabytes(os.getpid()), 'workers': [memoryMegabytes(pid) for pid in pids]}
+    finally:
+        for pid in pids:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+
+def report(mode, result):
+    print(f"[Bench] {mode}")
+    rows = ([('parent', result['parent'])] if result['parent'] else []) + \
+           [(f"worker {index}", memory) for index, memory in enumerate(result['workers'])]
+    for name, memory in rows:
+        print(f"[Bench]   {name:<9} | RSS {memory['rss']:7.0f} MB | PSS {memory['pss']:7.0f} MB "
+              f"| shared {memory['shared']:7.0f} MB | USS {memory['uss']:7.0f} MB")
+
+    # PSS splits every shared page between the processes mapping it, so the sum is the real footprint
+    total = sum(memory['pss'] for _, memory in rows)
+    print(f"[Bench]   {'total':<9} | PSS {total:7.0f} MB")
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-worker memory of pre-forked versus independently loaded workers")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--backend', default='torch')
+    parser.add_argument('--modes', choices=['independent', 'prefork'], nargs='+', default=['independent', 'prefork'])
+    parser.add_argument('--min-savings', type=float, default=0.3,
+                        help="Exit non-zero when prefork saves less than this fraction of the total PSS")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_DIR, 'config.json')) as f:
+        keywords = json.load(f)["KEYWORDS"]
+
+    if args.worker:
+        models = loadModels(args.backend)
+        warmUp(*models, keywords)
+        print(READY_MARKER, flush=True)
+        waitForever()
+
+    # Independent workers run first, before this process loads any model itself
+    totals = {}
+    if 'independent' in args.modes:
+        totals['independent'] = report(f"independent | {args.workers} workers | {args.backend}",
+                                       runIndependent(args.workers, args.backend))
+    if 'prefork' in args.modes:
+        totals['prefork'] = report(f"prefork | {args.workers} workers | {args.backend}",
+                                   runPrefork(args.workers, args.backend, keywords))
+
+    if len(totals) == 2:
+        savings = 1 - totals['prefork'] / totals['independent']
+        print(f"[Bench] prefork saves {savings:.0%} of the total PSS")
+        sys.exit(1 if savings < args.min_savings else 0)
@@ -0,0 +1,45 @@
+import sys
+import argparse
+import requests
+import subprocess
+from . import cycle
+from . import sandbox
+from . import fixtures
+
+def recordResponses():
+    original_request = requests.Session.request
+
+    def request(self, method, url, *args, **kwargs):
+        response = original_request(self, method, url, *args, **kwargs)
+        host, path, params = fixtures.splitUrl(response.request.url)
+        route, key = fixtures.classify(host, path, params)
+
+        if route and response.status_code == 200:
+            try:
+                fixtures.saveFixture(route, key, response.status_code, response.json())
+            except ValueError:
+                pass
+        return response
+
+    requests.Session.request = request
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record live API responses as replay fixtures")
+    parser.add_argument('--coins', type=int, default=10)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--fixtures-dir', default=fixtures.FIXTURES_DIR, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        fixtures.FIXTURES_DIR = args.fixtures_dir
+        recordResponses()
+        cycle.runCycle(args.coins)
+    else:
+        # Real sleeps are kept so recording stays within the providers' rate limits
+        sandbox_dir = sandbox.createSandbox({'top-number-of-coins': args.coins})
+        try:
+            subprocess.run([sys.executable, '-m', 'bench.recorder', '--worker', '--coins', str(args.coins),
+                            '--fixtures-dir', fixtures.FIXTURES_DIR], cwd=sandbox_dir, check=True)
+        finally:
+            sandbox.removeSandbox(sandbox_dir)
+        print(f"[Recorder] Fixtures written to {fixtures.FIXTURES_DIR}")
@@ -0,0 +1,60 @@
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from . import fixtures
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    rate_429 = 0.0
+
+    def do_GET(self):
+        host, _, rest = self.path.lstrip('/').partition('/')
+        _, path, params = fixtures.splitUrl(f"http://{host}/{rest}")
+        route, key = fixtures.classify(host, path, params)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if route is None:
+            self.respond(404, {'error': f"No replay route for {host}{path}"})
+        elif random.random() < self.rate_429:
+            self.respond(429, {'error': 'Too Many Requests'})
+        else:
+            self.respond(200, fixtures.resolveBody(route, key, params))
+
+    def respond(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def startServer(port=0, latency_ms=0, rate_429=0.0):
+    handler = type('ConfiguredReplayHandler', (ReplayHandler,), {
+        'latency': latency_ms / 1000,
+        'rate_429': rate_429,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded API responses locally")
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = startServer(args.port, args.latency_ms, args.rate_429)
+    print(f"[Replay] Serving fixtures on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,59 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import requests
+from . import fixtures
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SANDBOX_ITEMS = ['API', 'bench', 'collector.py', 'server.py', 'config.json']
+
+sleep_requested = 0.0
+
+def createSandbox(config_overrides=None):
+    # Copies the code into a temp dir so benchmark runs get their own logs/ tree
+    sandbox_dir = tempfile.mkdtemp(prefix="cryptologger-bench-")
+    ignore = shutil.ignore_patterns('__pycache__', 'fixtures', 'baselines')
+
+    for item in SANDBOX_ITEMS:
+        source = os.path.join(REPO_DIR, item)
+        target = os.path.join(sandbox_dir, item)
+        if os.path.isdir(source):
+            shutil.copytree(source, target, ignore=ignore)
+        elif os.path.exists(source):
+            shutil.copy2(source, target)
+
+    config_path = os.path.join(sandbox_dir, 'config.json')
+    with open(config_path) as f:
+        config = json.load(f)
+    config.update(config_overrides or {})
+    with open(config_path, 'w') as f:
+        json.dump(config, f, indent=2)
+
+    return sandbox_dir
+
+def removeSandbox(sandbox_dir):
+    shutil.rmtree(sandbox_dir, ignore_errors=True)
+
+def redirectRequests(base_url):
+    # Sends API traffic to the replay server as <base_url>/<host>/<path>
+    original_request = requests.Session.request
+
+    def request(self, method, url, *args, **kwargs):
+        parts = requests.utils.urlparse(url)
+        if parts.hostname in fixtures.API_HOSTS:
+            url = f"{base_url}/{parts.hostname}{parts.path}"
+            if parts.query:
+                url += f"?{parts.query}"
+        return original_request(self, method, url, *args, **kwargs)
+
+    requests.Session.request = request
+
+def skipSleeps():
+    # Rate-limit sleeps are tallied instead of slept, so hot paths dominate the timings
+    def sleep(seconds):
+        global sleep_requested
+        sleep_requested += max(seconds, 0)
+
+    time.sleep = sleep
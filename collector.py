@@ -1,12 +1,23 @@
 import requests
+import argparse
+import atexit
 import os
+import sys
 import csv
-import json
 import time
+import signal
+import socket
 import threading
+import numpy as np
 from datetime import datetime, timezone, timedelta
+from API import cluster
+from API import configWatcher
 from API import coingecko
-from API import cryptocompare
+from API import historySync
+from API import metrics
+from API import prefork
+from API import profiling
+from API import topCoins
 from API import news
 from API import reddit
 from API.analysis import weightedSentiment
@@ -14,17 +25,34 @@ from API.analysis import weightedSentiment
 SECONDS_IN_A_DAY = 86400
 MINUTE_TO_SECONDS = 60
 
-def isStableCoin(coin, stable_keywords):
-    name = coin['name'].lower()
-    symbol = coin['symbol'].lower()
-    price = coin.get('current_price', 0)
-
-    is_name_stable = any(kw in name or kw in symbol for kw in stable_keywords)
-    is_price_stable = 0.99 <= price <= 1.01
-
-    return is_name_stable or is_price_stable
+def parseMarkets(coins):
+    # Struct-of-arrays view of the /coins/markets response, built once per tick
+    return {
+        'id': np.array([coin['id'] for coin in coins], dtype=object),
+        'symbol': np.array([(coin.get('symbol') or '').upper() for coin in coins], dtype=object),
+        'name': np.array([coin.get('name') or '' for coin in coins], dtype=object),
+        'price': np.array([coin.get('current_price') or 0 for coin in coins], dtype=float),
+    }
 
-def getTopCoins(num_of_top_coins, num_to_search, currency, config):
+def stableMask(markets, stable_pattern):
+    # A coin is stable if a keyword appears in its name or symbol, or it trades within 1% of 1
+    is_stable = (markets['price'] >= 0.99) & (markets['price'] <= 1.01)
+    if stable_pattern is None or not len(is_stable):
+        return is_stable
+
+    # One lowercase "name<TAB>symbol" line per coin, so the keyword regex scans every coin in a single pass.
+    # Match offsets map back to coin indexes through the line start offsets
+    lines = [f"{name}\t{symbol}".lower() for name, symbol in zip(markets['name'], markets['symbol'])]
+    lengths = np.fromiter(map(len, lines), dtype=int, count=len(lines)) + 1
+    starts = np.cumsum(lengths) - lengths
+    matches = [match.start() for match in stable_pattern.finditer('\n'.join(lines))]
+    is_stable[np.searchsorted(starts, matches, side='right') - 1] = True
+    return is_stable
+
+def ignoredMask(markets, ignored_coins):
+    return np.fromiter((symbol.lower() in ignored_coins for symbol in markets['symbol']), dtype=bool, count=len(markets['symbol']))
+
+def fetchMarkets(num_to_search, currency):
     # Only modify this part if another API needs to be used instead of CoinGecko
     url = "https://api.coingecko.com/api/v3/coins/markets"
     params = {
@@ -36,24 +64,26 @@ def getTopCoins(num_of_top_coins, num_to_search, currency, config):
     }
 
     response = requests.get(url, params)
+    if response.status_code == 429:
+        metrics.incCounter('http_429_total', provider='coingecko')
     response.raise_for_status()
-    coins = response.json()
+    return response.json()
+
+@metrics.timed('collector.getTopCoins')
+def getTopCoins(num_of_top_coins, num_to_search, currency, config):
+    coins = cluster.sharedMarkets(num_to_search, currency, fetchMarkets)
 
-    stable_keywords = config.get("stable-coin-keywords", ['usd'])
-    ignored_coins = config.get("coins_ignored", [])
-    filtered_coins = [
-        coin for coin in coins
-        if not isStableCoin(coin, stable_keywords) and coin['symbol'].lower() not in ignored_coins
-    ]
-    top_coins = filtered_coins[:num_of_top_coins]
+    markets = parseMarkets(coins)
+    excluded = stableMask(markets, config['derived']['stable_pattern']) | ignoredMask(markets, config['derived']['ignored_coins'])
+    keep = np.flatnonzero(~excluded)[:num_of_top_coins]
 
-    coingecko.log(top_coins)
+    # In sharded mode the top N is chosen globally and each instance keeps its slice of the ring
+    if cluster.isSharded():
+        keep = keep[np.array([cluster.ownsSymbol(symbol) for symbol in markets['symbol'][keep]], dtype=bool)]
 
-    symbols = [coin['symbol'].upper() for coin in top_coins]
-    names = [coin['name'] for coin in top_coins]
-    ids = [coin['id'] for coin in top_coins]
+    coingecko.log([coins[i] for i in keep])
 
-    return symbols, names, ids
+    return markets['symbol'][keep].tolist(), markets['name'][keep].tolist(), markets['id'][keep].tolist()
 
 def waitUntilNextMinute():
     now = datetime.now(timezone.utc)
@@ -61,98 +91,130 @@ def waitUntilNextMinute():
     wait_seconds = (next_minute - now).total_seconds()
     time.sleep(wait_seconds)
 
-def continuousCollection():
-    last_top_symbols = set()
-    last_top_ids = set()
-    last_top_names = set()
+    # How late the tick starts relative to the minute boundary it was scheduled for
+    lateness = (datetime.now(timezone.utc) - next_minute).total_seconds()
+    metrics.observe('tick_lateness_seconds', lateness)
+    metrics.setGauge('tick_lateness_last_seconds', lateness)
+    return lateness
+
+def startThread(threads, name, target, *args):
+    # At most one thread per kind of job; a job that is still running is left alone
+    thread = threads.get(name)
+    if thread is None or not thread.is_alive():
+        thread = threads[name] = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+    return thread
+
+def continuousCollection(instance=None, metrics_port=None):
     last_run_day = None
     minute_counter = 0
+    threads = {}
+
+    def onTopCoinsChanged(added, removed):
+        if removed:
+            print(f"[{datetime.now(timezone.utc)}] Coins left the top:", [coin['symbol'] for coin in removed])
+        if not added:
+            return
+
+        config = configWatcher.getConfig()
+        new_symbols = [coin['symbol'] for coin in added]
+        print(f"[{datetime.now(timezone.utc)}] New coins detected:", new_symbols)
+
+        startThread(threads, 'hist', historySync.syncHistoricalData, new_symbols, [coin['id'] for coin in added],
+                    config["currency"], config["historical-data-days"])
+        startThread(threads, 'news', news.fetchCryptoNews, new_symbols, [coin['name'] for coin in added])
+        startThread(threads, 'reddit', reddit.fetchRedditPosts, new_symbols, config)
+        weightedSentiment.computeWeightedSentiment(topCoins.currentSymbols())
+
+    topCoins.subscribe(onTopCoinsChanged)
 
-    cc_thread = None
-    cg_thread = None
-    news_thread = None
-    reddit_thread = None
+    config = configWatcher.getConfig()
+    profiling.checkConfig(config)
+    configWatcher.subscribe(lambda previous, config: profiling.checkConfig(config))
 
-    with open("config.json") as f:
-        config = json.load(f)
+    if instance:
+        # Leaving on exit rebalances right away instead of after the heartbeat timeout
+        cluster.join(instance)
+        atexit.register(cluster.leave)
+
+    metrics_port = metrics_port if metrics_port is not None else config["metrics-port"]
+    if metrics_port:
+        try:
+            metrics.startServer(metrics_port)
+        except OSError as e:
+            print(f"[Metrics] Could not start metrics server: {e}")
+
+    profiling.installSignalHandler()
 
     while True:
         waitUntilNextMinute()
         minute_counter += 1
 
         try:
-            with open("config.json") as f:
-                config = json.load(f)
+            config = configWatcher.getConfig()
+
+            if cluster.isSharded():
+                cluster.heartbeat()
+
+            profiling.beginIteration()
 
-            num_of_top_coins = config.get("top-number-of-coins", 50)
-            num_to_search = num_of_top_coins + config.get("selection-margin", 20)
-            currency = config.get("currency", "usd")
-            days = config.get("historical-data-days", 90)
-            media_interval = config.get("media-interval", 15)
+            num_of_top_coins = config["top-number-of-coins"]
+            num_to_search = num_of_top_coins + config["selection-margin"]
+            currency = config["currency"]
+            days = config["historical-data-days"]
+            media_interval = config["media-interval"]
 
             now = datetime.now(timezone.utc)
             current_day = now.date()
             seconds_today = now.hour * 3600 + now.minute * 60 + now.second
 
             coins, names, ids = getTopCoins(num_of_top_coins, num_to_search, currency, config)
+            metrics.setGauge('tracked_coins', len(coins))
 
             if minute_counter % media_interval == 0:
-                if news_thread is None or not news_thread.is_alive():
-                    news_thread = threading.Thread(target=news.fetchCryptoNews, args=(coins, names), daemon=True)
-                    news_thread.start()
-                if reddit_thread is None or not reddit_thread.is_alive():
-                    reddit_thread = threading.Thread(target=reddit.fetchRedditPosts, args=(coins, config), daemon=True)
-                    reddit_thread.start()
+                media_cycle = profiling.beginMediaCycle()
+                news_thread = startThread(threads, 'news', news.fetchCryptoNews, coins, names)
+                reddit_thread = startThread(threads, 'reddit', reddit.fetchRedditPosts, coins, config)
 
+                profiling.watchMediaCycle(media_cycle, [news_thread, reddit_thread])
                 weightedSentiment.computeWeightedSentiment(coins)
                 minute_counter = 0
 
             if seconds_today >= SECONDS_IN_A_DAY - MINUTE_TO_SECONDS and last_run_day != current_day:
                 print("[Daily Update] Fetching top coins and full history...")
 
-                if cc_thread is None or not cc_thread.is_alive():
-                    cc_thread = threading.Thread(target=cryptocompare.collectHistoricalData, args=(coins, currency, days), daemon=True)
-                    cc_thread.start()
-
-                if cg_thread is None or not cg_thread.is_alive():
-                    cg_thread = threading.Thread(target=coingecko.collectHistoricalData, args=(coins, names, currency, days), daemon=True)
-                    cg_thread.start()
-
-                last_top_symbols = set(coins)
-                last_top_ids = set(ids)
-                last_top_names = set(names)
+                startThread(threads, 'hist', historySync.syncHistoricalData, coins, ids, currency, days)
                 last_run_day = current_day
-            else: 
-                new_symbols = [s for s in coins if s not in last_top_symbols]
-                new_names = [n for n in names if n not in last_top_names]
-                new_ids = [i for i in ids if i not in last_top_ids]
-
-                if new_symbols:
-                    print(f"[{datetime.now(timezone.utc)}] New coins detected:", new_symbols)
-                    
-                    if cc_thread is None or not cc_thread.is_alive():
-                        cc_thread = threading.Thread(target=cryptocompare.collectHistoricalData, args=(new_symbols, currency, days), daemon=True)
-                        cc_thread.start()
-
-                    if cg_thread is None or not cg_thread.is_alive():
-                        cg_thread = threading.Thread(target=coingecko.collectHistoricalData, args=(new_symbols, new_ids, currency, days), daemon=True)
-                        cg_thread.start()
-
-                    if news_thread is None or not news_thread.is_alive():
-                        news_thread = threading.Thread(target=news.fetchCryptoNews, args=(new_symbols, new_names), daemon=True)
-                        news_thread.start()
-
-                    if reddit_thread is None or not reddit_thread.is_alive():
-                        reddit_thread = threading.Thread(target=reddit.fetchRedditPosts, args=(new_symbols, config), daemon=True)
-                        reddit_thread.start()
-
-                    weightedSentiment.computeWeightedSentiment(coins)
-                    last_top_symbols.update(new_symbols)
-                    last_top_ids.update(new_ids)
-                    last_top_names.update(new_names)
+
+            # One keyed diff per tick; onTopCoinsChanged fetches history, news and Reddit for coins that entered
+            topCoins.update(coins, names, ids)
 
         except Exception as e:
             print(f"[Collector Error] {e}")
 
+        profiling.endIteration()
+
+def runWorker(index, instance, metrics_port):
+    # One shard of a pre-fork collector; os._exit in the worker skips atexit, so leave here
+    try:
+        continuousCollection(f"{instance}-{index}", metrics_port + index if metrics_port else 0)
+    finally:
+        cluster.leave()
+
 if __name__ == "__main__":
-    continuousCollection()
+    parser = argparse.ArgumentParser(description="CryptoLogger collector")
+    parser.add_argument('--instance', help="Run as one shard of a multi-instance collector under this name")
+    parser.add_argument('--metrics-port', type=int, help="Override metrics-port, e.g. for several instances on one host")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Load the models once, then fork this many sharded collectors that share them")
+    args = parser.parse_args()
+
+    if args.workers > 0:
+        # FinBERT and the zero-shot classifier were loaded by the news/reddit imports above
+        instance = args.instance or socket.gethostname()
+        metrics_port = args.metrics_port if args.metrics_port is not None else configWatcher.getConfig()["metrics-port"]
+        prefork.run(args.workers, lambda index: runWorker(index, instance, metrics_port))
+    else:
+        # The default SIGTERM (systemd, docker stop, kill) skips atexit; exiting through SystemExit runs cluster.leave
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        continuousCollection(args.instance, args.metrics_port)
@@ -0,0 +1,13 @@
+import os
+import multiprocessing
+
+bind = os.environ.get("CRYPTOLOGGER_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("CRYPTOLOGGER_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = 4
+timeout = 60
+
+# Import pandas and the app once in the master; workers share those pages copy-on-write
+preload_app = True
+
+accesslog = "-"
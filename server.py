@@ -1,12 +1,44 @@
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 import pandas as pd
 import os
+import json
+from API import archive
+from API import bars
+from API import cluster
+from API import latestState
+from API import mergedHistory
+from API import responseCache
+from API.analysis import weightedSentiment
 
 app = Flask(__name__)
 CORS(app)
 
 BASE_LOGS_DIR = os.path.join(os.path.dirname(__file__), 'logs')
+LIVE_DIR = os.path.join(BASE_LOGS_DIR, 'live_data')
+
+
+def read_live_csv(filename):
+    """
+    Read a live_data CSV, unioning the copies written by each collector shard.
+    """
+    paths = cluster.shardFiles(LIVE_DIR, filename)
+    if not paths:
+        return None
+    return pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+
+
+def cached_json(key, sources, build):
+    """
+    Serve a JSON body from the response cache shared by all workers, rebuilt only when
+    one of its source files changes and compressed when the client accepts it.
+    """
+    body, encoding = responseCache.getResponse(key, sources, build, request.headers.get('Accept-Encoding'))
+    response = Response(body, mimetype='application/json')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 @app.route('/api/files', methods=['GET'])
 def list_all_csvs():
@@ -33,13 +65,15 @@ def get_csv_file(folder, filename):
     try:
         if not filename.endswith('.csv'):
             return jsonify({'error': 'Only .csv files are allowed'}), 400
+        if folder not in os.listdir(BASE_LOGS_DIR):
+            return jsonify({'error': f"{folder} not found"}), 404
 
         file_path = os.path.join(BASE_LOGS_DIR, folder, filename)
         if not os.path.exists(file_path):
             return jsonify({'error': f"{folder}/{filename} not found"}), 404
 
-        df = pd.read_csv(file_path)
-        return jsonify(df.to_dict(orient='records'))
+        return cached_json(f"file:{folder}/{filename}", [file_path],
+                           lambda: pd.read_csv(file_path).to_dict(orient='records'))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -47,15 +81,14 @@ def get_csv_file(folder, filename):
 @app.route('/api/live', methods=['GET'])
 def get_live_data():
     """
-    Return contents of live_data/live_data.csv.
+    Return contents of live_data/live_data.csv, across all collector shards.
     """
     try:
-        file_path = os.path.join(BASE_LOGS_DIR, 'live_data', 'live_data.csv')
-        if not os.path.exists(file_path):
+        paths = cluster.shardFiles(LIVE_DIR, 'live_data.csv')
+        if not paths:
             return jsonify({'error': 'live_data.csv not found'}), 404
 
-        df = pd.read_csv(file_path)
-        return jsonify(df.to_dict(orient='records'))
+        return cached_json('live', paths, lambda: read_live_csv('live_data.csv').to_dict(orient='records'))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -63,18 +96,168 @@ def get_live_data():
 @app.route('/api/live_sentiment', methods=['GET'])
 def get_live_sentiment():
     """
-    Return contents of live_data/live_sentiment.csv.
+    Return contents of live_data/live_sentiment.csv, across all collector shards.
     """
     try:
-        file_path = os.path.join(BASE_LOGS_DIR, 'live_data', 'live_sentiment.csv')
-        if not os.path.exists(file_path):
+        paths = cluster.shardFiles(LIVE_DIR, 'live_sentiment.csv')
+        if not paths:
             return jsonify({'error': 'live_sentiment.csv not found'}), 404
 
-        df = pd.read_csv(file_path)
-        return jsonify(df.to_dict(orient='records'))
+        return cached_json('live_sentiment', paths, lambda: read_live_csv('live_sentiment.csv').to_dict(orient='records'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+
+@app.route('/api/latest', methods=['GET'])
+def get_latest():
+    """
+    Return the latest tick per tracked coin, joined with its outlier flags and sentiment.
+    """
+    try:
+        return cached_json('latest', cluster.shardFiles(LIVE_DIR, 'latest.json'),
+                           lambda: list(latestState.readLatest().values()))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/latest/<symbol>', methods=['GET'])
+def get_latest_symbol(symbol):
+    """
+    Return the latest tick, outlier flags and sentiment for one coin.
+    """
+    try:
+        row = latestState.readLatest().get(symbol.upper())
+        if row is None:
+            return jsonify({'error': f"{symbol.upper()} is not currently tracked"}), 404
+
+        return jsonify(row)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/sentiment/<symbol>', methods=['GET'])
+def get_symbol_sentiment(symbol):
+    """
+    Return the 1h/6h/24h/7d windowed and time-decayed sentiment aggregates for one coin.
+    """
+    try:
+        if symbol.upper() not in latestState.readLatest():
+            return jsonify({'error': f"{symbol.upper()} is not currently tracked"}), 404
+
+        return jsonify({'symbol': symbol.upper(), **weightedSentiment.getAggregateSentiments(symbol)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/history', methods=['GET'])
+def get_merged_history():
+    """
+    Return the reconciled daily OHLCV history for all symbols.
+    """
+    try:
+        return cached_json('history', [mergedHistory.DATA_PATH],
+                           lambda: mergedHistory.loadMergedHistory().to_dict(orient='records'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/history/<symbol>', methods=['GET'])
+def get_symbol_history(symbol):
+    """
+    Return the reconciled daily OHLCV history for one symbol.
+    """
+    try:
+        df = mergedHistory.getSymbolHistory(symbol)
+        if df is None:
+            return jsonify({'error': f"No history for {symbol.upper()}"}), 404
+
+        return cached_json(f"history:{symbol.upper()}", [mergedHistory.DATA_PATH],
+                           lambda: df.to_dict(orient='records'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+
+@app.route('/api/bars/<symbol>/<interval>', methods=['GET'])
+def get_bars(symbol, interval):
+    """
+    Return intraday OHLCV bars for a symbol, including the currently open bar.
+    """
+    try:
+        if interval not in bars.BAR_INTERVALS:
+            return jsonify({'error': f"Interval must be one of {list(bars.BAR_INTERVALS)}"}), 400
+
+        # Cache keys come from the URL, so only tracked coins get a cache entry
+        if symbol.upper() not in latestState.readLatest():
+            return jsonify(bars.getBars(symbol, interval))
+
+        sources = [bars.barPath(symbol.upper(), interval)] + cluster.shardFiles(bars.BARS_DIR, 'open_bars.json')
+        return cached_json(f"bars:{symbol.upper()}:{interval}", sources, lambda: bars.getBars(symbol, interval))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/archive', methods=['GET'])
+def get_archive_summary():
+    """
+    Summarize the archived days and row counts per data kind.
+    """
+    try:
+        summary = {}
+        for kind in archive.KINDS:
+            index = archive.loadIndex(kind)
+            if index:
+                summary[kind] = {
+                    'days': len(index),
+                    'rows': sum(entry['rows'] for entry in index.values()),
+                    'first': min(index),
+                    'last': max(index),
+                }
+        return jsonify(summary)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/archive/<kind>', methods=['GET'])
+def get_archive(kind):
+    """
+    Stream archived rows of one kind, filtered by ?symbol=, ?start= and ?end= (ISO dates or timestamps).
+    Only the day files in range are decompressed, row by row.
+    """
+    if kind not in archive.KINDS:
+        return jsonify({'error': f"Kind must be one of {archive.KINDS}"}), 400
+
+    start, end = request.args.get('start'), request.args.get('end')
+    try:
+        archive.parseRange(start, end)
+    except ValueError as e:
+        return jsonify({'error': f"Invalid start or end: {e}"}), 400
+
+    rows = archive.readArchive(kind, request.args.get('symbol'), start, end)
+    try:
+        # Errors before the first row (missing or corrupt day file) still get a proper 500
+        first = next(rows, None)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        yield '['
+        if first is None:
+            yield ']'
+            return
+        yield json.dumps(first)
+        try:
+            for row in rows:
+                yield ',' + json.dumps(row)
+        except Exception as e:
+            # The 200 status is already sent; end with an error element so the body stays valid JSON
+            print(f"[Archive] Streaming {kind} failed: {e}")
+            yield ',' + json.dumps({'error': str(e)})
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
 if __name__ == '__main__':
     app.run(debug=True, port=8000)